@@ -15,10 +15,13 @@
 # imports from python standard library
 import grading
 import imp
+import multiprocessing
 import optparse
 import os
+import pickle
 import re
 import sys
+import traceback
 import projectParams
 import random
 random.seed(0)
@@ -79,6 +82,11 @@ def readCommand(argv):
                     dest = 'noGraphics',
                     action = 'store_true',
                     help = 'No graphics display for pacman games.')
+    parser.add_option('--jobs', '-j',
+                    dest = 'jobs',
+                    type = 'int',
+                    default = 1,
+                    help = 'Number of worker processes that run test cases in parallel.')
     (options, args) = parser.parse_args(argv)
     return options
 
@@ -243,10 +251,111 @@ def getTestSubdirs(testParser, testRoot, questionToGrade):
     return sorted(os.listdir(testRoot))
 
 
+# the test thunks a forked --jobs worker may be asked to run (set in workers only)
+WORKER_THUNKS = None
+
+
+def installWorkerThunks(thunks):
+    "Pool initializer: gives a forked worker the thunks of its evaluate() call"
+    global WORKER_THUNKS
+    WORKER_THUNKS = thunks
+
+
+class WorkerTraceback(Exception):
+    "Carries the formatted traceback of an exception raised in a worker"
+
+    def __init__(self, tb):
+        self.tb = tb
+
+    def __str__(self):
+        return self.tb
+
+
+def runThunkInWorker(index):
+    """
+    Runs a registered test thunk in a worker process, recording its grade calls
+    and printed output.  Exceptions are returned with their traceback so that
+    the parent can raise them where the test would have raised them.
+    """
+    grades = grading.RecordedGrades()
+    result, error = None, None
+    stdout = sys.stdout
+    sys.stdout = grades
+    try:
+        result = WORKER_THUNKS[index](grades)
+    except BaseException as inst:
+        try:
+            pickle.dumps(inst)
+        except Exception:
+            inst = Exception('%s: %s' % (type(inst).__name__, inst))
+        error = (inst, traceback.format_exc())
+    finally:
+        sys.stdout = stdout
+    return result, grades.events, error
+
+
+class ParallelTests:
+    """
+    The test thunks of one evaluate() call, run in a pool of forked worker
+    processes (--jobs).  The tests of a question are only started once all of
+    its prerequisites have passed, so no work is spent on questions that the
+    grader will skip.
+    """
+
+    def __init__(self):
+        self.thunks = []
+        self.questionTests = {}  # question -> indices of its thunks
+        self.prereqs = {}  # question -> questions that must pass first
+        self.results = {}  # thunk index -> pending result
+        self.started = set()
+        self.completed = set()
+        self.pool = None
+
+    def register(self, question, thunk):
+        """
+        Registers a test thunk to run in a worker process and returns a thunk
+        that replays its recorded effects on the grades object it is called with.
+        """
+        index = len(self.thunks)
+        self.thunks.append(thunk)
+        self.questionTests.setdefault(question, []).append(index)
+
+        def replay(grades):
+            result, events, error = self.results[index].get()
+            grading.RecordedGrades.replay(events, grades)
+            if error is not None:
+                inst, tb = error
+                raise inst from WorkerTraceback(tb)
+            return result
+        return replay
+
+    def start(self, jobs):
+        self.pool = multiprocessing.get_context('fork').Pool(
+            jobs, initializer=installWorkerThunks, initargs=(self.thunks,))
+        self.startReadyQuestions()
+
+    def questionPassed(self, question):
+        self.completed.add(question)
+        self.startReadyQuestions()
+
+    def startReadyQuestions(self):
+        for question, indices in self.questionTests.items():
+            if question in self.started or not self.prereqs.get(question, set()) <= self.completed:
+                continue
+            self.started.add(question)
+            for index in indices:
+                self.results[index] = self.pool.apply_async(runThunkInWorker, (index,))
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool = None
+
+
 # evaluate student code
 def evaluate(generateSolutions, testRoot, moduleDict, exceptionMap=ERROR_HINT_MAP,
              edxOutput=False, muteOutput=False, gsOutput=False,
-            printTestCase=False, questionToGrade=None, display=None):
+            printTestCase=False, questionToGrade=None, display=None, jobs=1):
     # imports of testbench code.  note that the testClasses import must follow
     # the import of student code due to dependencies
     import testParser
@@ -254,6 +363,15 @@ def evaluate(generateSolutions, testRoot, moduleDict, exceptionMap=ERROR_HINT_MA
     for module in moduleDict:
         setattr(sys.modules[__name__], module, moduleDict[module])
 
+    # Test cases are independent, so with several jobs they run in forked
+    # workers; questions still execute in order (and skip on failed
+    # prerequisites) and replay the recorded results.
+    parallel = jobs > 1 and not generateSolutions
+    if parallel and 'fork' not in multiprocessing.get_all_start_methods():
+        print('Note: --jobs needs fork() support; running test cases serially')
+        parallel = False
+    parallelTests = ParallelTests() if parallel else None
+
     questions = []
     questionDicts = {}
     test_subdirs = getTestSubdirs(testParser, testRoot, questionToGrade)
@@ -293,12 +411,22 @@ def evaluate(generateSolutions, testRoot, moduleDict, exceptionMap=ERROR_HINT_MA
                         return lambda grades: printTest(testDict, solutionDict) or testCase.execute(grades, moduleDict, solutionDict)
                     else:
                         return lambda grades: testCase.execute(grades, moduleDict, solutionDict)
-            question.addTestCase(testCase, makefun(testCase, solution_file))
+            thunk = makefun(testCase, solution_file)
+            if parallel:
+                thunk = parallelTests.register(q, thunk)
+            question.addTestCase(testCase, thunk)
 
         # Note extra function is necessary for scoping reasons
-        def makefun(question):
-            return lambda grades: question.execute(grades)
-        setattr(sys.modules[__name__], q, makefun(question))
+        def makefun(question, q):
+            if not parallel:
+                return lambda grades: question.execute(grades)
+            def run(grades):
+                result = question.execute(grades)
+                if grades.points[q] >= grades.maxes[q]:
+                    parallelTests.questionPassed(q)
+                return result
+            return run
+        setattr(sys.modules[__name__], q, makefun(question, q))
         questions.append((q, question.getMaxPoints()))
 
     grades = grading.Grades(projectParams.PROJECT_NAME, questions,
@@ -307,8 +435,18 @@ def evaluate(generateSolutions, testRoot, moduleDict, exceptionMap=ERROR_HINT_MA
         for q in questionDicts:
             for prereq in questionDicts[q].get('depends', '').split():
                 grades.addPrereq(q, prereq)
-
-    grades.grade(sys.modules[__name__], bonusPic = projectParams.BONUS_PIC)
+                if parallel:
+                    parallelTests.prereqs.setdefault(q, set()).add(prereq)
+
+    if not parallel:
+        grades.grade(sys.modules[__name__], bonusPic = projectParams.BONUS_PIC)
+        return grades.points
+
+    try:
+        parallelTests.start(jobs)
+        grades.grade(sys.modules[__name__], bonusPic = projectParams.BONUS_PIC)
+    finally:
+        parallelTests.close()
     return grades.points
 
 
@@ -317,6 +455,9 @@ def getDisplay(graphicsByDefault, options=None):
     graphics = graphicsByDefault
     if options is not None and options.noGraphics:
         graphics = False
+    # Test cases running in worker processes cannot share a window
+    if options is not None and options.jobs > 1:
+        graphics = False
     if graphics:
         try:
             import graphicsDisplay
@@ -355,4 +496,5 @@ if __name__ == '__main__':
         evaluate(options.generateSolutions, options.testRoot, moduleDict,
             gsOutput=options.gsOutput,
             edxOutput=options.edxOutput, muteOutput=options.muteOutput, printTestCase=options.printTestCase,
-            questionToGrade=options.gradeQuestion, display=getDisplay(options.gradeQuestion!=None, options))
+            questionToGrade=options.gradeQuestion, display=getDisplay(options.gradeQuestion!=None, options),
+            jobs=options.jobs)
@@ -13,7 +13,161 @@
 
 
 import search
+import itertools
 import random
+import struct
+from collections import deque
+
+# Boards and packed states
+#
+# The puzzle is played on an N x N board; the eight puzzle has N = 3 and the
+# fifteen puzzle N = 4.  A puzzle is packed into one integer: with b bits per
+# tile, bits b*i to b*i+b-1 hold the tile at cell i (cells are numbered row by
+# row, 0 is the blank) and the bits above the tiles hold the cell of the
+# blank, so it never has to be searched for.  A PuzzleBoard holds everything
+# that only depends on N, and getBoard shares one per size.
+
+class PuzzleBoard:
+    """
+    The geometry of an N x N board: packing, the moves of the blank and the
+    Manhattan distance / linear conflict heuristic.
+    """
+    MOVE_VECTORS = [('up', -1, 0), ('down', 1, 0), ('left', 0, -1), ('right', 0, 1)]
+    PRECOMPUTED_LINES = 4096
+
+    def __init__(self, size):
+        self.size = size
+        self.cells = size * size
+        self.tileBits = (self.cells - 1).bit_length()
+        self.tileMask = (1 << self.tileBits) - 1
+        self.blankShift = self.tileBits * self.cells
+        self.lineBits = self.tileBits * size
+        self.lineMask = (1 << self.lineBits) - 1
+        # The shift of each cell's tile; a column moves the tile of its i-th
+        # cell from top down to tileBits * i
+        self.cellShifts = [self.tileBits * cell for cell in range(self.cells)]
+        self.columnShifts = [[(self.cellShifts[i * size + line], self.tileBits * i) for i in range(size)]
+                             for line in range(size)]
+
+        # moveTable[blank] lists (move, cell the blank moves to) for every legal move
+        self.moveTable = []
+        for cell in range(self.cells):
+            row, col = divmod(cell, size)
+            self.moveTable.append([(move, (row + dr) * size + col + dc)
+                                   for move, dr, dc in PuzzleBoard.MOVE_VECTORS
+                                   if 0 <= row + dr < size and 0 <= col + dc < size])
+        # moveDeltas[blank] lists, for every legal move, (move, shift of the
+        # tile that moves, change of the blank's bits, change of the state per
+        # unit of that tile): applyMove without the shifts, see getSuccessors
+        self.moveDeltas = []
+        for blank, moves in enumerate(self.moveTable):
+            self.moveDeltas.append([(move, self.tileBits * nextBlank, self.applyMove(0, blank, nextBlank),
+                                     (1 << (self.tileBits * blank)) - (1 << (self.tileBits * nextBlank)))
+                                    for move, nextBlank in moves])
+        self.goal = self.pack(list(range(self.cells)))
+
+        # The heuristic share of each line, filled in as lines are seen
+        self.rowValues = [LineValues(self, line, True) for line in range(size)]
+        self.columnValues = [LineValues(self, line, False) for line in range(size)]
+        # (shift of the row, row values, column values, column shifts) per line
+        self.lines = list(zip([self.lineBits * line for line in range(size)],
+                              self.rowValues, self.columnValues, self.columnShifts))
+        # The eight puzzle has few lines, so they are all filled in up front
+        if self.cells ** size <= PuzzleBoard.PRECOMPUTED_LINES:
+            for tiles in itertools.permutations(range(self.cells), size):
+                bits = sum([tile << (self.tileBits * i) for i, tile in enumerate(tiles)])
+                for line in range(size):
+                    self.rowValues[line][bits] = self.lineValue(bits, line, True)
+                    self.columnValues[line][bits] = self.lineValue(bits, line, False)
+
+    def pack(self, numbers):
+        "Packs the numbers of a puzzle, row by row, into an integer state"
+        packed = numbers.index(0) << self.blankShift
+        for cell, tile in enumerate(numbers):
+            packed |= tile << (self.tileBits * cell)
+        return packed
+
+    def unpack(self, packed):
+        "Returns the numbers of a packed state, row by row"
+        return [(packed >> (self.tileBits * cell)) & self.tileMask for cell in range(self.cells)]
+
+    def getBlank(self, packed):
+        return packed >> self.blankShift
+
+    def tileCells(self, packed):
+        "Returns a list with the cell of every tile of a packed state"
+        cells = [0] * self.cells
+        tileMask = self.tileMask
+        for cell, shift in enumerate(self.cellShifts):
+            cells[(packed >> shift) & tileMask] = cell
+        return cells
+
+    def applyMove(self, packed, blank, nextBlank):
+        "Returns the packed state after the blank at cell blank moves to nextBlank"
+        shift = self.tileBits * nextBlank
+        tile = (packed >> shift) & self.tileMask
+        return (packed - (tile << shift) + (tile << (self.tileBits * blank))
+                + ((nextBlank - blank) << self.blankShift))
+
+    def linearConflict(self, packed):
+        """
+        Returns the Manhattan distance plus the linear conflicts of a packed
+        state.  Both are sums over the rows and columns of the board; the
+        share of a row or column is looked up by its tiles, first tile lowest.
+        """
+        value = 0
+        tileMask, lineMask = self.tileMask, self.lineMask
+        for rowShift, rowValues, columnValues, columnShifts in self.lines:
+            value += rowValues[(packed >> rowShift) & lineMask]
+            column = 0
+            for shift, columnShift in columnShifts:
+                column |= ((packed >> shift) & tileMask) << columnShift
+            value += columnValues[column]
+        return value
+
+    def lineValue(self, bits, line, isRow):
+        """
+        The share of one line: for a row the Manhattan distances of its tiles,
+        and for both rows and columns 2 moves for every tile that has to
+        leave the line to let the others of the line pass.
+        """
+        size = self.size
+        tiles = [(bits >> (self.tileBits * i)) & self.tileMask for i in range(size)]
+        if isRow:
+            distance = sum([abs(tile // size - line) + abs(tile % size - i)
+                            for i, tile in enumerate(tiles) if tile != 0])
+            return distance + lineConflict([tile % size for tile in tiles
+                                            if tile != 0 and tile // size == line])
+        return lineConflict([tile // size for tile in tiles
+                             if tile != 0 and tile % size == line])
+
+class LineValues(dict):
+    "The heuristic shares of one row or column of a board, keyed by its tiles"
+    def __init__(self, board, line, isRow):
+        self.board, self.line, self.isRow = board, line, isRow
+
+    def __missing__(self, bits):
+        value = self[bits] = self.board.lineValue(bits, self.line, self.isRow)
+        return value
+
+def lineConflict(goalPositions):
+    """
+    Returns the linear conflict of the tiles of a line whose goal is in that
+    line, given their goal positions along it in their current order: twice
+    the number of tiles outside a longest increasing subsequence.
+    """
+    longest = []
+    for i, position in enumerate(goalPositions):
+        longest.append(1 + max([longest[j] for j in range(i) if goalPositions[j] < position] + [0]))
+    return 2 * (len(goalPositions) - max(longest + [0]))
+
+BOARDS = {}
+
+def getBoard(size):
+    "Returns the shared PuzzleBoard of a size"
+    if size not in BOARDS:
+        BOARDS[size] = PuzzleBoard(size)
+    return BOARDS[size]
 
 # Module Classes
 
@@ -25,6 +179,8 @@ class EightPuzzleState:
     This class defines the mechanics of the puzzle itself.  The
     task of recasting this puzzle as a search problem is left to
     the EightPuzzleSearchProblem class.
+
+    Larger square boards (the fifteen puzzle, ...) work the same way.
     """
 
     def __init__( self, numbers ):
@@ -46,18 +202,34 @@ class EightPuzzleState:
             | 6 | 7 | 8 |
             ------------
 
-        The configuration of the puzzle is stored in a 2-dimensional
-        list (a list of lists) 'cells'.
+        A list of N * N numbers gives a puzzle on an N x N board.
+
+        The configuration of the puzzle is stored as a packed integer in
+        'packed' (see PuzzleBoard); 'cells' gives it as a list of lists.
         """
-        self.cells = []
-        numbers = numbers[:] # Make a copy so as not to cause side-effects.
-        numbers.reverse()
-        for row in range( 3 ):
-            self.cells.append( [] )
-            for col in range( 3 ):
-                self.cells[row].append( numbers.pop() )
-                if self.cells[row][col] == 0:
-                    self.blankLocation = row, col
+        size = int(round(len(numbers) ** 0.5))
+        if size * size != len(numbers):
+            raise Exception('A puzzle needs a square number of cells, not %d' % len(numbers))
+        self.board = getBoard(size)
+        self.packed = self.board.pack(numbers)
+
+    @staticmethod
+    def fromPacked(packed, board):
+        "Returns the puzzle of a packed state on a board"
+        puzzle = EightPuzzleState.__new__(EightPuzzleState)
+        puzzle.board = board
+        puzzle.packed = packed
+        return puzzle
+
+    @property
+    def cells(self):
+        numbers = self.board.unpack(self.packed)
+        size = self.board.size
+        return [numbers[row * size:(row + 1) * size] for row in range(size)]
+
+    @property
+    def blankLocation(self):
+        return divmod(self.board.getBlank(self.packed), self.board.size)
 
     def isGoal( self ):
         """
@@ -77,13 +249,7 @@ class EightPuzzleState:
         >>> EightPuzzleState([1, 0, 2, 3, 4, 5, 6, 7, 8]).isGoal()
         False
         """
-        current = 0
-        for row in range( 3 ):
-            for col in range( 3 ):
-                if current != self.cells[row][col]:
-                    return False
-                current += 1
-        return True
+        return self.packed == self.board.goal
 
     def legalMoves( self ):
         """
@@ -95,17 +261,7 @@ class EightPuzzleState:
         >>> EightPuzzleState([0, 1, 2, 3, 4, 5, 6, 7, 8]).legalMoves()
         ['down', 'right']
         """
-        moves = []
-        row, col = self.blankLocation
-        if(row != 0):
-            moves.append('up')
-        if(row != 2):
-            moves.append('down')
-        if(col != 0):
-            moves.append('left')
-        if(col != 2):
-            moves.append('right')
-        return moves
+        return [move for move, nextBlank in self.board.moveTable[self.board.getBlank(self.packed)]]
 
     def result(self, move):
         """
@@ -113,37 +269,17 @@ class EightPuzzleState:
         updated based on the provided move.
 
         The move should be a string drawn from a list returned by legalMoves.
-        Illegal moves will raise an exception, which may be an array bounds
-        exception.
+        Illegal moves raise an exception.
 
         NOTE: This function *does not* change the current object.  Instead,
         it returns a new object.
         """
-        row, col = self.blankLocation
-        if(move == 'up'):
-            newrow = row - 1
-            newcol = col
-        elif(move == 'down'):
-            newrow = row + 1
-            newcol = col
-        elif(move == 'left'):
-            newrow = row
-            newcol = col - 1
-        elif(move == 'right'):
-            newrow = row
-            newcol = col + 1
-        else:
-            raise "Illegal Move"
-
-        # Create a copy of the current eightPuzzle
-        newPuzzle = EightPuzzleState([0, 0, 0, 0, 0, 0, 0, 0, 0])
-        newPuzzle.cells = [values[:] for values in self.cells]
-        # And update it to reflect the move
-        newPuzzle.cells[row][col] = self.cells[newrow][newcol]
-        newPuzzle.cells[newrow][newcol] = self.cells[row][col]
-        newPuzzle.blankLocation = newrow, newcol
-
-        return newPuzzle
+        board = self.board
+        blank = board.getBlank(self.packed)
+        for legalMove, nextBlank in board.moveTable[blank]:
+            if legalMove == move:
+                return EightPuzzleState.fromPacked(board.applyMove(self.packed, blank, nextBlank), board)
+        raise Exception('Illegal Move: %s' % move)
 
     # Utilities for comparison and display
     def __eq__(self, other):
@@ -155,27 +291,25 @@ class EightPuzzleState:
               EightPuzzleState([1, 0, 2, 3, 4, 5, 6, 7, 8]).result('left')
           True
         """
-        for row in range( 3 ):
-            if self.cells[row] != other.cells[row]:
-                return False
-        return True
+        return self.board is other.board and self.packed == other.packed
 
     def __hash__(self):
-        return hash(str(self.cells))
+        return hash(self.packed)
 
     def __getAsciiString(self):
         """
           Returns a display string for the maze
         """
         lines = []
-        horizontalLine = ('-' * (13))
+        width = len(str(self.board.cells - 1))
+        horizontalLine = ('-' * ((width + 3) * self.board.size + 1))
         lines.append(horizontalLine)
         for row in self.cells:
             rowLine = '|'
             for col in row:
                 if col == 0:
                     col = ' '
-                rowLine = rowLine + ' ' + col.__str__() + ' |'
+                rowLine = rowLine + ' ' + col.__str__().rjust(width) + ' |'
             lines.append(rowLine)
             lines.append(horizontalLine)
         return '\n'.join(lines)
@@ -183,23 +317,167 @@ class EightPuzzleState:
     def __str__(self):
         return self.__getAsciiString()
 
-# TODO: Implement The methods in this class
+# Pattern databases
+
+PATTERN_DATABASE_MAGIC = b'EPD3'
+PATTERN_DATABASE_HEADER = struct.Struct('<BBB')  # board size, additive, number of tiles
+
+# The databases built by --build-database for each board size: a
+# non-additive pattern for the eight puzzle and disjoint additive ones for
+# larger boards, small enough to build in pure Python
+DEFAULT_PATTERNS = {
+    3: [((1, 2, 3, 4, 5, 6), False)],
+    4: [((1, 2, 3, 6, 7), True), ((4, 5, 8, 9, 12), True), ((10, 11, 13, 14, 15), True)],
+    5: [((1, 2, 3), True), ((4, 9, 14), True), ((5, 10, 15), True), ((6, 7, 8), True),
+        ((11, 12, 13), True), ((16, 17, 18), True), ((19, 23, 24), True), ((20, 21, 22), True)],
+}
+
+class PatternDatabase:
+    """
+    A lower bound on the moves left, looked up from the cells of a pattern
+    of tiles while ignoring all other tiles.
+
+    A database stores a value for every placement of the blank and the
+    pattern tiles.  For a non-additive database it is the exact number of
+    moves needed to bring them to their goal cells.  An additive database
+    counts only the moves of pattern tiles, so the values of additive
+    databases with disjoint patterns can be summed (see puzzleHeuristic).
+
+    Both kinds are consistent, and so is the sum of disjoint additive ones: a
+    move shifts one tile, which changes the value of at most one database by
+    at most one.  The additive tables still depend on the blank's cell,
+    although blank moves that shift no pattern tile are free.  Taking the
+    minimum over all blank cells would make a table N * N times smaller, but
+    a single move could then lower the sum by more than one.
+
+    A placement is ranked as a base N * N number with one digit per tile
+    and the blank's cell as the lowest digit, and table is a bytearray
+    indexed by that rank.  Building the table is a 0-1 breadth first search
+    over placements, which is better done once, offline:
+
+        > python eightpuzzle.py --size 4 --build-database fifteen.db
+    """
+    def __init__(self, board, pattern, table, additive=False):
+        self.board = board
+        self.pattern = tuple(pattern)
+        self.table = table
+        self.additive = additive
+        # The weight of each tile's cell in the rank; the blank's weight is 1
+        self.weights = [board.cells ** (i + 1) for i in range(len(self.pattern))]
+        # The same weights indexed by tile, 0 for the tiles outside the pattern
+        self.tileWeights = [0] * board.cells
+        for tile, weight in zip(self.pattern, self.weights):
+            self.tileWeights[tile] = weight
+
+    def value(self, state):
+        "Returns the value of a packed state, reading its tiles directly"
+        board = self.board
+        rank = state >> board.blankShift
+        tileWeights, tileMask = self.tileWeights, board.tileMask
+        for cell, shift in enumerate(board.cellShifts):
+            rank += tileWeights[(state >> shift) & tileMask] * cell
+        return self.table[rank]
+
+    def lookup(self, blank, tileCells):
+        "Returns the value for the blank's cell and the cells of every tile"
+        rank = blank
+        for tile, weight in zip(self.pattern, self.weights):
+            rank += tileCells[tile] * weight
+        return self.table[rank]
+
+    @staticmethod
+    def build(board, pattern, additive=False):
+        pattern = tuple(pattern)
+        cells = board.cells
+        weights = [cells ** i for i in range(len(pattern))]
+        def rank(tileCells):
+            return sum([cell * weight for cell, weight in zip(tileCells, weights)])
+
+        # Placements are (blank, tile cells); the blank's cell is ranked lowest
+        distances = bytearray([0xFF]) * (cells ** (len(pattern) + 1))
+        goal = (0,) + pattern  # The goal cell of each tile is its number
+        distances[goal[0] + cells * rank(goal[1:])] = 0
+        frontier = deque([(0, goal)])
+        while frontier:
+            distance, placement = frontier.popleft()
+            blank, tileCells = placement[0], placement[1:]
+            tileRank = rank(tileCells)
+            if distance > distances[blank + cells * tileRank]: continue
+
+            for move, nextBlank in board.moveTable[blank]:
+                # A pattern tile in the way swaps places with the blank
+                if nextBlank in tileCells:
+                    nextCells = tuple([blank if cell == nextBlank else cell for cell in tileCells])
+                    cost = 1
+                else:
+                    nextCells = tileCells
+                    cost = 0 if additive else 1
+                index = nextBlank + cells * rank(nextCells)
+                if distance + cost < distances[index]:
+                    distances[index] = distance + cost
+                    if cost == 0:
+                        frontier.appendleft((distance, (nextBlank,) + nextCells))
+                    else:
+                        frontier.append((distance + 1, (nextBlank,) + nextCells))
+        return PatternDatabase(board, pattern, distances, additive)
+
+def savePatternDatabases(path, databases):
+    "Writes pattern databases to one file"
+    with open(path, 'wb') as f:
+        f.write(PATTERN_DATABASE_MAGIC + struct.pack('<B', len(databases)))
+        for database in databases:
+            f.write(PATTERN_DATABASE_HEADER.pack(database.board.size, database.additive,
+                                                 len(database.pattern)))
+            f.write(bytes(database.pattern) + bytes(database.table))
+
+def loadPatternDatabases(path):
+    "Reads the pattern databases written by savePatternDatabases"
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:4] != PATTERN_DATABASE_MAGIC:
+        raise Exception('Not a pattern database file: %s' % path)
+    databases = []
+    offset = 5
+    for i in range(data[4]):
+        size, additive, numTiles = PATTERN_DATABASE_HEADER.unpack_from(data, offset)
+        offset += PATTERN_DATABASE_HEADER.size
+        board = getBoard(size)
+        pattern = tuple(data[offset:offset + numTiles])
+        offset += numTiles
+        length = board.cells ** (numTiles + 1)
+        table = bytearray(data[offset:offset + length])
+        offset += length
+        if len(table) != length:
+            raise Exception('Corrupt pattern database file: %s' % path)
+        databases.append(PatternDatabase(board, pattern, table, bool(additive)))
+    return databases
 
 class EightPuzzleSearchProblem(search.SearchProblem):
     """
       Implementation of a SearchProblem for the  Eight Puzzle domain
 
-      Each state is represented by an instance of an eightPuzzle.
+      Each state is a packed integer (see PuzzleBoard); EightPuzzleState.fromPacked
+      turns one back into an eightPuzzle.  The pattern databases, which must
+      be for the puzzle's board, are used by puzzleHeuristic.
     """
-    def __init__(self,puzzle):
+    def __init__(self, puzzle, patternDatabases=()):
         "Creates a new EightPuzzleSearchProblem which stores search information."
         self.puzzle = puzzle
+        self.board = puzzle.board
+        for database in patternDatabases:
+            if database.board is not self.board:
+                raise Exception('Pattern database for a %dx%d board' % (database.board.size, database.board.size))
+        self.patternDatabases = [database for database in patternDatabases if not database.additive]
+        self.additiveDatabases = [database for database in patternDatabases if database.additive]
+        # A lone database is read straight from the state by puzzleHeuristic
+        self.onlyDatabase = patternDatabases[0] if len(patternDatabases) == 1 else None
+        self._expanded = 0
 
     def getStartState(self):
-        return puzzle
+        return self.puzzle.packed
 
     def isGoalState(self,state):
-        return state.isGoal()
+        return state == self.board.goal
 
     def getSuccessors(self,state):
         """
@@ -207,10 +485,11 @@ class EightPuzzleSearchProblem(search.SearchProblem):
           each succesor is either left, right, up, or down
           from the original state and the cost is 1.0 for each
         """
-        succ = []
-        for a in state.legalMoves():
-            succ.append((state.result(a), a, 1))
-        return succ
+        self._expanded += 1
+        board = self.board
+        tileMask = board.tileMask
+        return [(state + blankDelta + ((state >> shift) & tileMask) * tileDelta, move, 1)
+                for move, shift, blankDelta, tileDelta in board.moveDeltas[board.getBlank(state)]]
 
     def getCostOfActions(self, actions):
         """
@@ -221,6 +500,34 @@ class EightPuzzleSearchProblem(search.SearchProblem):
         """
         return len(actions)
 
+def puzzleHeuristic(state, problem):
+    """
+    The largest of the linear conflict heuristic, the sum of the problem's
+    additive pattern databases and each of its other pattern databases.  All
+    of them are admissible and consistent (see PatternDatabase), so the
+    largest is too.
+
+    With several databases the cells of the tiles are found once and shared
+    by all the lookups.
+    """
+    board = problem.board
+    value = board.linearConflict(state)
+    if problem.onlyDatabase is not None:
+        databaseValue = problem.onlyDatabase.value(state)
+        if databaseValue > value:
+            value = databaseValue
+    elif problem.patternDatabases or problem.additiveDatabases:
+        blank, tileCells = board.getBlank(state), board.tileCells(state)
+        additive = 0
+        for database in problem.additiveDatabases:
+            additive += database.lookup(blank, tileCells)
+        value = max(value, additive)
+        for database in problem.patternDatabases:
+            value = max(value, database.lookup(blank, tileCells))
+    return value
+
+eightPuzzleHeuristic = puzzleHeuristic
+
 EIGHT_PUZZLE_DATA = [[1, 0, 2, 3, 4, 5, 6, 7, 8],
                      [1, 7, 8, 2, 3, 4, 5, 6, 0],
                      [4, 3, 2, 7, 0, 5, 1, 6, 8],
@@ -256,14 +563,75 @@ def createRandomEightPuzzle(moves=100):
       a series of 'moves' random moves to a solved
       puzzle.
     """
-    puzzle = EightPuzzleState([0,1,2,3,4,5,6,7,8])
+    return createRandomPuzzle(3, moves)
+
+def createRandomPuzzle(size, moves=100):
+    "Like createRandomEightPuzzle, on a size x size board"
+    puzzle = EightPuzzleState(list(range(size * size)))
     for i in range(moves):
         # Execute a random legal move
         puzzle = puzzle.result(random.sample(puzzle.legalMoves(), 1)[0])
     return puzzle
 
+def benchmarkPuzzles(numPuzzles, size=3, moves=100, patternDatabases=(),
+                     searchFunction=search.aStarSearch, seed=None):
+    """
+    Solves numPuzzles random puzzles with searchFunction and puzzleHeuristic,
+    and returns (total moves, total expanded nodes, elapsed seconds).
+    """
+    import time
+    random.seed(seed)
+    puzzles = [createRandomPuzzle(size, moves) for i in range(numPuzzles)]
+    totalMoves, expanded = 0, 0
+    start = time.time()
+    for puzzle in puzzles:
+        problem = EightPuzzleSearchProblem(puzzle, patternDatabases)
+        totalMoves += len(searchFunction(problem, heuristic=puzzleHeuristic))
+        expanded += problem._expanded
+    return totalMoves, expanded, time.time() - start
+
+def readCommand(argv):
+    from optparse import OptionParser
+    parser = OptionParser('USAGE:      python eightpuzzle.py <options>')
+    parser.add_option('-s', '--size', dest='size', type='int', default=3,
+                      help='the side of the board: 3 for the eight puzzle, 4 for the fifteen puzzle [Default: %default]')
+    parser.add_option('--build-database', dest='buildDatabase', default=None, metavar='FILE',
+                      help='build the DEFAULT_PATTERNS databases of the board size and save them to FILE')
+    parser.add_option('-d', '--database', dest='database', default=None, metavar='FILE',
+                      help='load pattern databases from FILE for puzzleHeuristic')
+    parser.add_option('-n', '--benchmark', dest='benchmark', type='int', default=0,
+                      help='solve this many random puzzles and report the rate')
+    parser.add_option('-m', '--moves', dest='moves', type='int', default=100,
+                      help='the random moves that scramble each benchmark puzzle [Default: %default]')
+    parser.add_option('-f', '--fn', dest='fn', default='astar',
+                      help='the search function in search.py for the benchmark [Default: %default]')
+    options, otherjunk = parser.parse_args(argv)
+    if len(otherjunk) != 0:
+        raise Exception('Command line input not understood: ' + str(otherjunk))
+    return options
+
 if __name__ == '__main__':
-    puzzle = createRandomEightPuzzle(25)
+    import sys
+    options = readCommand(sys.argv[1:])
+    board = getBoard(options.size)
+    if options.buildDatabase:
+        databases = [PatternDatabase.build(board, pattern, additive)
+                     for pattern, additive in DEFAULT_PATTERNS[options.size]]
+        savePatternDatabases(options.buildDatabase, databases)
+        print('Saved %d pattern databases to %s' % (len(databases), options.buildDatabase))
+        sys.exit(0)
+    patternDatabases = []
+    if options.database:
+        patternDatabases = loadPatternDatabases(options.database)
+    if options.benchmark > 0:
+        totalMoves, expanded, elapsed = benchmarkPuzzles(options.benchmark, options.size, options.moves,
+                                                         patternDatabases, getattr(search, options.fn), 'cs188')
+        print('Solved %d puzzles in %.2fs (%.1f puzzles/s)' % (options.benchmark, elapsed, options.benchmark / elapsed))
+        print('Average solution length %.1f, average nodes expanded %.1f' %
+              (totalMoves / float(options.benchmark), expanded / float(options.benchmark)))
+        sys.exit(0)
+
+    puzzle = createRandomPuzzle(options.size, 25)
     print('A random puzzle:')
     print(puzzle)
 
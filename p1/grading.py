@@ -302,6 +302,40 @@ to follow your instructor's guidelines to receive credit on your project.
       #self.messages[self.currentQuestion].append(line)
 
 
+class RecordedGrades:
+  """
+  Stands in for a Grades object while a test case runs in a worker process
+  (autograder.py --jobs).  Grade calls and printed output are recorded
+  instead of applied, so that they can be replayed in their original order
+  on the real Grades object of the parent process.
+  """
+  RECORDED_CALLS = ('addMessage', 'addPoints', 'deductPoints',
+                    'assignFullCredit', 'assignZeroCredit', 'fail')
+
+  def __init__(self):
+    self.events = []
+
+  def __getattr__(self, name):
+    if name not in RecordedGrades.RECORDED_CALLS:
+      raise AttributeError(name)
+    return lambda *args, **kwargs: self.events.append((name, args, kwargs))
+
+  def write(self, text):
+    "Records printed output; the recorder is installed as sys.stdout"
+    self.events.append((None, (text,), {}))
+
+  def flush(self):
+    pass
+
+  @staticmethod
+  def replay(events, grades):
+    for name, args, kwargs in events:
+      if name is None:
+        sys.stdout.write(*args)
+      else:
+        getattr(grades, name)(*args, **kwargs)
+
+
 
 
 
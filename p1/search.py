@@ -72,6 +72,54 @@ def tinyMazeSearch(problem):
     w = Directions.WEST
     return  [s, s, w, s, w, w, s, w]
 
+class SearchNodes:
+    """
+    Parent-pointer store shared by the graph searches below.
+
+    Every node created during a search is recorded once as a (parent, action)
+    pair and referred to by its integer index.  Frontier entries then carry
+    only that index instead of a full copy of the action list, and the plan
+    is rebuilt a single time when a goal is reached.
+    """
+
+    ROOT = -1
+
+    def __init__(self):
+        self.parents = []
+        self.actions = []
+
+    def add(self, parent, action):
+        """
+        Records a node reached from node `parent` by `action` and returns its
+        index.  The root node uses SearchNodes.ROOT as parent and None as action.
+        """
+        self.parents.append(parent)
+        self.actions.append(action)
+        return len(self.parents) - 1
+
+    def path(self, node):
+        "Returns the list of actions leading from the root to `node`."
+        parents, actions = self.parents, self.actions
+        path = []
+        while parents[node] != self.ROOT:
+            path.append(actions[node])
+            node = parents[node]
+        path.reverse()
+        return path
+
+    def pathFrom(self, node):
+        """
+        Returns the list of actions stored from `node` up to the root, in that
+        order.  For a search grown backwards from the goal this is the plan
+        leading from `node` to the goal.
+        """
+        parents, actions = self.parents, self.actions
+        path = []
+        while parents[node] != self.ROOT:
+            path.append(actions[node])
+            node = parents[node]
+        return path
+
 def depthFirstSearch(problem):
     """
     Search the deepest nodes in the search tree first.
@@ -90,15 +138,17 @@ def depthFirstSearch(problem):
     stack = util.Stack()
     # Set to store the visited nodes and avoid revisiting them
     visited = set()
-    # Starting node with empty action path
-    start_node = (problem.getStartState(), [])
+    # Node store that records only the parent and action of every node
+    nodes = SearchNodes()
+    # Starting node with no parent and no action
+    start_node = (problem.getStartState(), nodes.add(SearchNodes.ROOT, None))
 
     stack.push(start_node)  # Push the starting node to the stack
 
     # While there are nodes to be visited
     while not stack.isEmpty():
         # Pop the node from the stack
-        location, path = stack.pop()
+        location, node = stack.pop()
 
         # If the node has not been visited
         if location not in visited:
@@ -106,7 +156,7 @@ def depthFirstSearch(problem):
 
             # If the node is the goal state, return the path
             if problem.isGoalState(location):
-                return path  # Return the path
+                return nodes.path(node)  # Rebuild and return the path
 
             successors = problem.getSuccessors(location)  # Get the successors of the node
 
@@ -115,7 +165,7 @@ def depthFirstSearch(problem):
                 successor_location, action, cost = successor
 
                 if successor_location not in visited:
-                    stack.push((successor_location, path + [action]))
+                    stack.push((successor_location, nodes.add(node, action)))
 
     return []  # Return an empty list if no path was found
 
@@ -128,15 +178,17 @@ def breadthFirstSearch(problem):
     queue = util.Queue()
     # Set to store the visited nodes and avoid revisiting them
     visited = set()
-    # Starting node with empty action path
-    start_node = (problem.getStartState(), [])
+    # Node store that records only the parent and action of every node
+    nodes = SearchNodes()
+    # Starting node with no parent and no action
+    start_node = (problem.getStartState(), nodes.add(SearchNodes.ROOT, None))
 
     queue.push(start_node)  # Push the starting node to the queue
 
     # While there are nodes to be visited
     while not queue.isEmpty():
         # Pop the node from the queue
-        location, path = queue.pop()
+        location, node = queue.pop()
 
         # If the node has not been visited
         if location not in visited:
@@ -144,7 +196,7 @@ def breadthFirstSearch(problem):
 
             # If the node is the goal state, return the path
             if problem.isGoalState(location):
-                return path  # Return the path
+                return nodes.path(node)  # Rebuild and return the path
 
             successors = problem.getSuccessors(location)  # Get the successors of the node
 
@@ -153,7 +205,7 @@ def breadthFirstSearch(problem):
                 successor_location, action, cost = successor
 
                 if successor_location not in visited:
-                    queue.push((successor_location, path + [action]))
+                    queue.push((successor_location, nodes.add(node, action)))
 
     return []
 
@@ -163,17 +215,19 @@ def uniformCostSearch(problem):
     priority_queue = util.PriorityQueue()
     # Set to store the visited nodes and avoid revisiting them
     visited = set()
+    # Node store that records only the parent and action of every node
+    nodes = SearchNodes()
     # Start state of the problem
     start_state = problem.getStartState()
-    # Starting node with empty action path and zero cost
-    start_node = (start_state, [], 0)  # Node format: (state, path, cost)
+    # Starting node with no parent, no action and zero cost
+    start_node = (start_state, nodes.add(SearchNodes.ROOT, None), 0)  # Node format: (state, node index, cost)
 
     priority_queue.push(start_node, 0)  # Push the starting node to the priority queue
 
     # While there are nodes to be visited
     while not priority_queue.isEmpty():
         # Pop the node from the priority queue
-        current_state, path, current_cost = priority_queue.pop()
+        current_state, node, current_cost = priority_queue.pop()
 
         # If the node has not been visited then continue
         if current_state in visited:
@@ -183,16 +237,15 @@ def uniformCostSearch(problem):
 
         # If the node is the goal state, return the path
         if problem.isGoalState(current_state):
-            return path
+            return nodes.path(node)
 
         # Get the successors of the node and iterate over them
         for successor_state, action, step_cost in problem.getSuccessors(current_state):
             # If the successor has not been visited
             if successor_state not in visited:
-                # Create a new node with the successor state, the path to the successor and the cost to get there
-                new_path = path + [action]
+                # Create a new node with the successor state, a pointer back to its parent and the cost to get there
                 new_cost = current_cost + step_cost
-                new_node = (successor_state, new_path, new_cost)
+                new_node = (successor_state, nodes.add(node, action), new_cost)
                 # Push the new node to the priority queue
                 priority_queue.push(new_node, new_cost)
 
@@ -212,17 +265,19 @@ def aStarSearch(problem, heuristic=nullHeuristic):
     priority_queue = util.PriorityQueue()
     # Set to store the visited nodes and avoid revisiting them
     visited = set()
+    # Node store that records only the parent and action of every node
+    nodes = SearchNodes()
     # Start state of the problem
     start_state = problem.getStartState()
-    # Starting node with empty action path and zero cost
-    start_node = (start_state, [], 0)  # Node format: (state, path, cost)
+    # Starting node with no parent, no action and zero cost
+    start_node = (start_state, nodes.add(SearchNodes.ROOT, None), 0)  # Node format: (state, node index, cost)
 
     priority_queue.push(start_node, 0)  # Push the starting node to the priority queue
 
     # While there are nodes to be visited
     while not priority_queue.isEmpty():
         # Pop the node from the priority queue
-        current_state, path, current_cost = priority_queue.pop()
+        current_state, node, current_cost = priority_queue.pop()
 
         # If the node has not been visited then continue
         if current_state in visited:
@@ -232,24 +287,390 @@ def aStarSearch(problem, heuristic=nullHeuristic):
 
         # If the node is the goal state, return the path
         if problem.isGoalState(current_state):
-            return path
+            return nodes.path(node)
 
         # Get the successors of the node and iterate over them
         for successor_state, action, step_cost in problem.getSuccessors(current_state):
             # If the successor has not been visited
             if successor_state not in visited:
-                # Create a new node with the successor state, the path to the successor and the cost to get there
-                new_path = path + [action]
+                # Create a new node with the successor state, a pointer back to its parent and the cost to get there
                 new_cost = current_cost + step_cost
                 total_cost = new_cost + heuristic(successor_state, problem)  # Combined cost and heuristic
-                new_node = (successor_state, new_path, new_cost)
+                new_node = (successor_state, nodes.add(node, action), new_cost)
                 # Push the new node to the priority queue
                 priority_queue.push(new_node, total_cost)
 
     return []  # Return an empty list if no path was found
 
 
+def bidirectionalSearch(problem):
+    """
+    Search from the start and from the goal at the same time, always growing
+    the smaller of the two frontiers, until the searches meet on an optimal
+    path (uniform cost search from both ends; with unit costs this is a
+    bidirectional breadth-first search).
+
+    The problem must have a single goal, returned by problem.getGoalState(),
+    and problem.getPredecessors(state) must return the (predecessor, action,
+    stepCost) triples of the moves leading into `state`.
+    """
+    start_state = problem.getStartState()
+    goal_state = problem.getGoalState()
+    if start_state == goal_state:
+        return []
+
+    # One priority queue, cost table, node store and closed set per direction
+    sides = []
+    for root, expand in [(start_state, problem.getSuccessors), (goal_state, problem.getPredecessors)]:
+        side = {'queue': util.PriorityQueue(), 'cost': {root: 0}, 'nodes': SearchNodes(),
+                'index': {}, 'visited': set(), 'expand': expand}
+        side['index'][root] = side['nodes'].add(SearchNodes.ROOT, None)
+        side['queue'].push(root, 0)
+        sides.append(side)
+    forward, backward = sides
+
+    best_cost = float('inf')  # Cost of the cheapest path through a meeting state
+    meeting_state = None
+
+    while not forward['queue'].isEmpty() and not backward['queue'].isEmpty():
+        # No unexplored path can be cheaper than the two cheapest frontier nodes
+        if forward['queue'].peekPriority() + backward['queue'].peekPriority() >= best_cost:
+            break
+
+        # Expand the direction with the smaller frontier
+        if forward['queue'].size <= backward['queue'].size:
+            side, other = forward, backward
+        else:
+            side, other = backward, forward
+
+        current_state = side['queue'].pop()
+        side['visited'].add(current_state)
+        current_cost = side['cost'][current_state]
+        node = side['index'][current_state]
+
+        # Backwards, the actions of the predecessors still point towards the goal
+        for next_state, action, step_cost in side['expand'](current_state):
+            new_cost = current_cost + step_cost
+            if next_state not in side['visited'] and new_cost < side['cost'].get(next_state, float('inf')):
+                side['cost'][next_state] = new_cost
+                side['index'][next_state] = side['nodes'].add(node, action)
+                side['queue'].update(next_state, new_cost)
+
+            # A state reached from both ends joins a complete path
+            if next_state in other['cost'] and new_cost + other['cost'][next_state] < best_cost:
+                best_cost = new_cost + other['cost'][next_state]
+                meeting_state = next_state
+
+    if meeting_state is None:
+        return []  # Return an empty list if no path was found
+    return (forward['nodes'].path(forward['index'][meeting_state]) +
+            backward['nodes'].pathFrom(backward['index'][meeting_state]))
+
+
+def jumpPointSearch(problem, heuristic=nullHeuristic):
+    """
+    Jump Point Search: A* over the jump points of a 4-connected grid with unit
+    step costs, such as a PositionSearchProblem or an AnyFoodSearchProblem.
+
+    Instead of generating every neighbor, the search jumps in a straight line
+    until it reaches a goal or a cell where a new opening appears beside the
+    line (a vertical jump also stops wherever a horizontal jump from it would
+    stop), so only those jump points enter the frontier.  The walls are read
+    from problem.walls, and the goals are the food of the problem if it has any,
+    otherwise problem.goal.  Only expanded jump points count in problem._expanded.
+    """
+    from game import Actions
+
+    open_cells = set(problem.walls.asList(False))
+    if hasattr(problem, 'food'):
+        goals = set(problem.food.asList())
+    else:
+        goals = set([problem.goal])
+
+    def jump_horizontal(x, y, dx):
+        # Walk along the row until a wall, a goal or a new opening above or below
+        while True:
+            x += dx
+            if (x, y) not in open_cells:
+                return None
+            if (x, y) in goals:
+                return (x, y)
+            if ((x, y + 1) in open_cells and (x - dx, y + 1) not in open_cells) or \
+               ((x, y - 1) in open_cells and (x - dx, y - 1) not in open_cells):
+                return (x, y)
+
+    def jump_vertical(x, y, dy):
+        # Walk along the column; every cell also looks for jump points sideways
+        while True:
+            y += dy
+            if (x, y) not in open_cells:
+                return None
+            if (x, y) in goals:
+                return (x, y)
+            if ((x + 1, y) in open_cells and (x + 1, y - dy) not in open_cells) or \
+               ((x - 1, y) in open_cells and (x - 1, y - dy) not in open_cells):
+                return (x, y)
+            if jump_horizontal(x, y, 1) or jump_horizontal(x, y, -1):
+                return (x, y)
+
+    # Node store whose actions are straight segments (action, length)
+    nodes = SearchNodes()
+    start_state = problem.getStartState()
+    start_node = (start_state, nodes.add(SearchNodes.ROOT, None), 0, None)  # (state, node index, cost, direction)
+
+    priority_queue = util.PriorityQueue()
+    priority_queue.push(start_node, 0)
+    visited = set()
+
+    while not priority_queue.isEmpty():
+        current_state, node, current_cost, direction = priority_queue.pop()
+        if current_state in visited:
+            continue
+        visited.add(current_state)
+
+        if current_state in goals:
+            path = []
+            for action, length in nodes.path(node):
+                path += [action] * length
+            return path
+
+        # Keep the problem's expansion bookkeeping for the jump points
+        problem._expanded += 1
+        if current_state not in problem._visited:
+            problem._visited[current_state] = True
+            problem._visitedlist.append(current_state)
+
+        # Go on straight or turn aside; turning back never helps
+        if direction is None:
+            directions = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+        elif direction[1] == 0:
+            directions = [direction, (0, 1), (0, -1)]
+        else:
+            directions = [direction, (1, 0), (-1, 0)]
+
+        x, y = current_state
+        for dx, dy in directions:
+            if dy == 0:
+                jump_point = jump_horizontal(x, y, dx)
+            else:
+                jump_point = jump_vertical(x, y, dy)
+            if jump_point is None or jump_point in visited:
+                continue
+            length = abs(jump_point[0] - x) + abs(jump_point[1] - y)
+            new_cost = current_cost + length
+            segment = (Actions.vectorToDirection((dx, dy)), length)
+            new_node = (jump_point, nodes.add(node, segment), new_cost, (dx, dy))
+            priority_queue.push(new_node, new_cost + heuristic(jump_point, problem))
+
+    return []  # Return an empty list if no path was found
+
+
+def iterativeDeepeningAStarSearch(problem, heuristic=nullHeuristic):
+    """
+    IDA*: repeated depth-first searches that prune nodes whose cost plus
+    heuristic exceeds a bound, raising the bound to the smallest pruned value
+    after every pass.  Memory stays linear in the length of the path, at the
+    price of re-expanding states, and only the current path is checked for
+    cycles.  With an admissible heuristic the plan is optimal.
+    """
+    start_state = problem.getStartState()
+    if problem.isGoalState(start_state):
+        return []
+    bound = heuristic(start_state, problem)
+
+    while True:
+        next_bound = float('inf')  # Smallest f-value pruned in this pass
+        # The current path: its states, actions and costs, plus one successor iterator per state
+        path_states, actions, costs = [start_state], [], [0]
+        on_path = set(path_states)
+        successor_stack = [iter(problem.getSuccessors(start_state))]
+
+        while successor_stack:
+            try:
+                successor_state, action, step_cost = next(successor_stack[-1])
+            except StopIteration:
+                # Every successor tried: step back along the path
+                successor_stack.pop()
+                on_path.discard(path_states.pop())
+                costs.pop()
+                if actions:
+                    actions.pop()
+                continue
+
+            if successor_state in on_path:
+                continue
+            new_cost = costs[-1] + step_cost
+            f_value = new_cost + heuristic(successor_state, problem)
+            if f_value > bound:
+                next_bound = min(next_bound, f_value)
+                continue
+            if problem.isGoalState(successor_state):
+                return actions + [action]
+
+            path_states.append(successor_state)
+            on_path.add(successor_state)
+            actions.append(action)
+            costs.append(new_cost)
+            successor_stack.append(iter(problem.getSuccessors(successor_state)))
+
+        if next_bound == float('inf'):
+            return []  # Return an empty list if no path was found
+        bound = next_bound
+
+# Node limit of smaStarSearch unless one is given or set on the problem
+SMA_MEMORY_LIMIT = 100000
+
+class MemoryBoundedNode:
+    """
+    A search tree node of smaStarSearch.  Besides its own f-value it knows its
+    children in memory and the smallest f-value among the children it forgot.
+    """
+    __slots__ = ['state', 'parent', 'action', 'cost', 'depth', 'f_value',
+                 'children', 'forgotten', 'in_open', 'alive']
+
+    def __init__(self, state, parent, action, cost, f_value):
+        self.state = state
+        self.parent = parent
+        self.action = action
+        self.cost = cost
+        self.depth = parent.depth + 1 if parent else 0
+        self.f_value = f_value
+        self.children = []
+        self.forgotten = float('inf')
+        self.in_open = True  # Some successors are not in memory
+        self.alive = True    # Not forgotten yet
+
+    def path(self):
+        actions = []
+        node = self
+        while node.parent is not None:
+            actions.append(node.action)
+            node = node.parent
+        actions.reverse()
+        return actions
+
+def smaStarSearch(problem, heuristic=nullHeuristic, memoryLimit=None):
+    """
+    Simplified memory-bounded A* (SMA*), which keeps at most memoryLimit search
+    nodes.  It behaves like A* until memory is full; then the leaf with the
+    highest f-value is forgotten and its parent remembers that value, so the
+    subtree is only regenerated once everything else looks worse.  f-values
+    are backed up from children to parents, and a successor is dropped when
+    its state is already in memory with a cost that is no higher.
+
+    The plan is optimal when an optimal solution fits in memoryLimit nodes;
+    when no solution does, the search gives up and returns an empty list.
+    Without a memoryLimit argument the problem's memoryLimit attribute is used
+    (see searchAgents.SMAStarSearchAgent), or else SMA_MEMORY_LIMIT.
+    """
+    import heapq
+    if memoryLimit is None:
+        memoryLimit = getattr(problem, 'memoryLimit', SMA_MEMORY_LIMIT)
+    memory_limit = int(memoryLimit)
+    infinity = float('inf')
+
+    start_state = problem.getStartState()
+    root = MemoryBoundedNode(start_state, None, None, 0, heuristic(start_state, problem))
+    # OPEN: lowest f-value first, deepest first among equals.  Leaves that can
+    # be forgotten: highest f-value first, shallowest first.  Entries that no
+    # longer match their node are skipped when popped.
+    open_heap = [(root.f_value, 0, 0, root)]
+    leaf_heap = []
+    best_in_memory = {start_state: root}  # Cheapest node in memory for every state
+    node_count = 1
+    entry_count = 1
+
+    def push_open(node):
+        nonlocal entry_count
+        heapq.heappush(open_heap, (node.f_value, -node.depth, entry_count, node))
+        entry_count += 1
+
+    def push_leaf(node):
+        nonlocal entry_count
+        heapq.heappush(leaf_heap, (-node.f_value, node.depth, entry_count, node))
+        entry_count += 1
+
+    def back_up(node):
+        # A node is worth at least the smallest f-value below it
+        while node is not None:
+            lowest = min([child.f_value for child in node.children] + [node.forgotten])
+            if lowest <= node.f_value:
+                break
+            node.f_value = lowest
+            if node.in_open:
+                push_open(node)
+            if not node.children:
+                push_leaf(node)
+            node = node.parent
+
+    while open_heap:
+        f_value, _, _, node = heapq.heappop(open_heap)
+        if not node.alive or not node.in_open or f_value != node.f_value:
+            continue
+        if f_value == infinity:
+            break  # Every remaining path is too long to fit in memory
+        if problem.isGoalState(node.state):
+            return node.path()
+
+        # (Re)generate the successors that are not in memory
+        in_memory = set(child.state for child in node.children)
+        ancestor = node
+        while ancestor is not None:
+            in_memory.add(ancestor.state)
+            ancestor = ancestor.parent
+        for successor_state, action, step_cost in problem.getSuccessors(node.state):
+            if successor_state in in_memory:
+                continue
+            new_cost = node.cost + step_cost
+            other = best_in_memory.get(successor_state)
+            if other is not None and other.cost <= new_cost:
+                continue
+            if node.depth + 2 > memory_limit:
+                f_child = infinity  # The path to it would not fit in memory
+            else:
+                f_child = max(new_cost + heuristic(successor_state, problem), node.f_value)
+            child = MemoryBoundedNode(successor_state, node, action, new_cost, f_child)
+            node.children.append(child)
+            best_in_memory[successor_state] = child
+            node_count += 1
+            push_open(child)
+            push_leaf(child)
+
+        node.in_open = False
+        node.forgotten = infinity
+        if not node.children:
+            node.f_value = infinity  # A dead end
+            push_leaf(node)
+            back_up(node.parent)
+        else:
+            back_up(node)
+
+        # Forget the worst leaves until the nodes fit in memory again
+        while node_count > memory_limit and leaf_heap:
+            negative_f, _, _, leaf = heapq.heappop(leaf_heap)
+            if not leaf.alive or leaf.children or leaf.parent is None or -negative_f != leaf.f_value:
+                continue
+            leaf.alive = False
+            node_count -= 1
+            if best_in_memory.get(leaf.state) is leaf:
+                del best_in_memory[leaf.state]
+            parent = leaf.parent
+            parent.children.remove(leaf)
+            parent.forgotten = min(parent.forgotten, leaf.f_value)
+            if not parent.in_open:
+                parent.in_open = True
+                push_open(parent)
+            if not parent.children:
+                push_leaf(parent)
+
+    return []  # Return an empty list if no path was found
+
+
 # Abbreviations
+bidir = bidirectionalSearch
+idastar = iterativeDeepeningAStarSearch
+smastar = smaStarSearch
+jps = jumpPointSearch
 bfs = breadthFirstSearch
 dfs = depthFirstSearch
 astar = aStarSearch
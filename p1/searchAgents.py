@@ -40,6 +40,7 @@ from game import Actions
 import util
 import time
 import search
+from collections import OrderedDict, deque
 
 class GoWestAgent(Agent):
     "An agent that goes West until it can't."
@@ -210,6 +211,32 @@ class PositionSearchProblem(search.SearchProblem):
 
         return successors
 
+    def getGoalState(self):
+        return self.goal
+
+    def getPredecessors(self, state):
+        """
+        Returns the states from which a single move reaches `state`, the
+        actions they require, and the cost of entering `state`.  Used by the
+        backward half of search.bidirectionalSearch.
+        """
+        predecessors = []
+        cost = self.costFn(state)
+        for action in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
+            x,y = state
+            dx, dy = Actions.directionToVector(action)
+            prevx, prevy = int(x - dx), int(y - dy)
+            if not self.walls[prevx][prevy]:
+                predecessors.append( ( (prevx, prevy), action, cost) )
+
+        # Bookkeeping for display purposes
+        self._expanded += 1 # DO NOT CHANGE
+        if state not in self._visited:
+            self._visited[state] = True
+            self._visitedlist.append(state)
+
+        return predecessors
+
     def getCostOfActions(self, actions):
         """
         Returns the cost of a particular sequence of actions. If those actions
@@ -250,6 +277,23 @@ class StayWestSearchAgent(SearchAgent):
         costFn = lambda pos: 2 ** pos[0]
         self.searchType = lambda state: PositionSearchProblem(state, costFn)
 
+class SMAStarSearchAgent(SearchAgent):
+    """
+    A SearchAgent running smaStarSearch with a node limit, for example
+
+    > python pacman.py -l bigMaze -p SMAStarSearchAgent -a memoryLimit=5000,heuristic=manhattanHeuristic
+
+    The limit is handed to the search as the memoryLimit attribute of the
+    problem, so SearchAgent itself is unchanged.
+    """
+    def __init__(self, memoryLimit=search.SMA_MEMORY_LIMIT, prob='PositionSearchProblem', heuristic='nullHeuristic'):
+        SearchAgent.__init__(self, 'smaStarSearch', prob, heuristic)
+        searchFunction = self.searchFunction
+        def searchWithLimit(problem):
+            problem.memoryLimit = int(memoryLimit)
+            return searchFunction(problem)
+        self.searchFunction = searchWithLimit
+
 def manhattanHeuristic(position, problem, info={}):
     "The Manhattan distance heuristic for a PositionSearchProblem"
     xy1 = position
@@ -285,24 +329,66 @@ class CornersProblem(search.SearchProblem):
             if not startingGameState.hasFood(*corner):
                 print('Warning: no food in corner ' + str(corner))
         self._expanded = 0 # DO NOT CHANGE; Number of search nodes expanded
-        # Please add any code here which you would like to use
-        # in initializing the problem
-        "*** YOUR CODE HERE ***"
+        # States are (position, visitedMask); bit i of the mask is corners[i]
+        self.cornerBits = dict((corner, 1 << i) for i, corner in enumerate(self.corners))
+        self.allVisited = (1 << len(self.corners)) - 1
+        startMask = self.cornerBits.get(self.startingPosition, 0)
+        self.start = (self.startingPosition, startMask)
+        self.initializeDistances(startingGameState.data.layout)
+
+    def initializeDistances(self, layout):
+        """
+        Precomputes, from the layout's distance table:
+
+          cornerDistances[position][i]:  maze distance to corners[i]
+          tourLengths[mask][i]:          length of the shortest walk that
+                                         starts at corners[i] and visits
+                                         every corner not in the mask
+          remainingCosts[position][mask]: length of the shortest walk from
+                                         the position through every corner
+                                         not in the mask
+
+        remainingCosts is the exact cost to the goal of every state, which
+        makes cornersHeuristic a single lookup.  Unreachable corners count
+        as distance 0, so the values stay lower bounds.
+        """
+        def mazeDistance(pos1, pos2):
+            distance = layout.distance(pos1, pos2)
+            if distance is None: return 0
+            return distance
+
+        corners = range(len(self.corners))
+        self.cornerDistances = dict((cell, [mazeDistance(cell, corner) for corner in self.corners])
+                                    for cell in self.walls.asList(False))
+
+        # Fill in the tours of larger visited sets first
+        self.tourLengths = [[0] * len(self.corners) for mask in range(self.allVisited + 1)]
+        for mask in range(self.allVisited - 1, -1, -1):
+            for i in corners:
+                distances = self.cornerDistances[self.corners[i]]
+                self.tourLengths[mask][i] = min([distances[j] + self.tourLengths[mask | 1 << j][j]
+                                                 for j in corners if not mask & 1 << j])
+
+        self.remainingCosts = {}
+        for cell, distances in self.cornerDistances.items():
+            costs = [0] * (self.allVisited + 1)
+            for mask in range(self.allVisited):
+                costs[mask] = min([distances[j] + self.tourLengths[mask | 1 << j][j]
+                                   for j in corners if not mask & 1 << j])
+            self.remainingCosts[cell] = costs
 
     def getStartState(self):
         """
         Returns the start state (in your state space, not the full Pacman state
         space)
         """
-        "*** YOUR CODE HERE ***"
-        util.raiseNotDefined()
+        return self.start
 
     def isGoalState(self, state):
         """
         Returns whether this search state is a goal state of the problem.
         """
-        "*** YOUR CODE HERE ***"
-        util.raiseNotDefined()
+        return state[1] == self.allVisited
 
     def getSuccessors(self, state):
         """
@@ -316,15 +402,14 @@ class CornersProblem(search.SearchProblem):
         """
 
         successors = []
+        (x, y), visitedMask = state
         for action in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
-            # Add a successor state to the successor list if the action is legal
-            # Here's a code snippet for figuring out whether a new position hits a wall:
-            #   x,y = currentPosition
-            #   dx, dy = Actions.directionToVector(action)
-            #   nextx, nexty = int(x + dx), int(y + dy)
-            #   hitsWall = self.walls[nextx][nexty]
-
-            "*** YOUR CODE HERE ***"
+            dx, dy = Actions.directionToVector(action)
+            nextx, nexty = int(x + dx), int(y + dy)
+            if not self.walls[nextx][nexty]:
+                nextPosition = (nextx, nexty)
+                nextMask = visitedMask | self.cornerBits.get(nextPosition, 0)
+                successors.append(((nextPosition, nextMask), action, 1))
 
         self._expanded += 1 # DO NOT CHANGE
         return successors
@@ -356,11 +441,8 @@ def cornersHeuristic(state, problem):
     shortest path from the state to a goal of the problem; i.e.  it should be
     admissible (as well as consistent).
     """
-    corners = problem.corners # These are the corner coordinates
-    walls = problem.walls # These are the walls of the maze, as a Grid (game.py)
-
-    "*** YOUR CODE HERE ***"
-    return 0 # Default to trivial solution
+    position, visitedMask = state
+    return problem.remainingCosts[position][visitedMask]
 
 class AStarCornersAgent(SearchAgent):
     "A SearchAgent for FoodSearchProblem using A* and your foodHeuristic"
@@ -383,6 +465,10 @@ class FoodSearchProblem:
         self.startingGameState = startingGameState
         self._expanded = 0 # DO NOT CHANGE
         self.heuristicInfo = {} # A dictionary for the heuristic to store information
+        # The food at the start, numbered: bit i of a food mask is foodCells[i]
+        self.foodCells = self.start[1].asList()
+        self.foodBits = dict((cell, 1 << i) for i, cell in enumerate(self.foodCells))
+        self.foodMasks = {} # foodGrid.bits -> food mask, see getPositionAndFoodMask
 
     def getStartState(self):
         return self.start
@@ -390,24 +476,51 @@ class FoodSearchProblem:
     def isGoalState(self, state):
         return state[1].count() == 0
 
+    def getPositionAndFoodMask(self, state):
+        """
+        Returns Pacman's position and the bitmask of the food left in a state.
+        getSuccessors derives the mask of a successor from its parent's, so
+        only masks of states it did not generate are computed from the grid.
+        """
+        position, foodGrid = state
+        foodMask = self.foodMasks.get(foodGrid.bits)
+        if foodMask is None:
+            foodMask = 0
+            for cell in self.foodCells:
+                if foodGrid[cell[0]][cell[1]]:
+                    foodMask |= self.foodBits[cell]
+            self.foodMasks[foodGrid.bits] = foodMask
+        return position, foodMask
+
+    def getHeuristicToolkit(self):
+        "Returns the FoodHeuristicToolkit of this problem, built on first use"
+        if 'toolkit' not in self.heuristicInfo:
+            self.heuristicInfo['toolkit'] = FoodHeuristicToolkit(self)
+        return self.heuristicInfo['toolkit']
+
     def getSuccessors(self, state):
         "Returns successor states, the actions they require, and a cost of 1."
         successors = []
         self._expanded += 1 # DO NOT CHANGE
+        foodMask = self.foodMasks.get(state[1].bits)
         for direction in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
             x,y = state[0]
             dx, dy = Actions.directionToVector(direction)
             nextx, nexty = int(x + dx), int(y + dy)
             if not self.walls[nextx][nexty]:
                 nextFood = state[1].copy()
+                ate = nextFood[nextx][nexty]
                 nextFood[nextx][nexty] = False
+                if ate and foodMask is not None:
+                    # Eating clears one bit of the parent's food mask
+                    self.foodMasks[nextFood.bits] = foodMask & ~self.foodBits.get((nextx, nexty), 0)
                 successors.append( ( ((nextx, nexty), nextFood), direction, 1) )
         return successors
 
     def getCostOfActions(self, actions):
         """Returns the cost of a particular sequence of actions.  If those actions
         include an illegal move, return 999999"""
-        x,y= self.getStartState()[0]
+        x,y= self.start[0]
         cost = 0
         for action in actions:
             # figure out the next state and see whether it's legal
@@ -418,6 +531,168 @@ class FoodSearchProblem:
             cost += 1
         return cost
 
+class CompactFoodSearchProblem(FoodSearchProblem):
+    """
+    The FoodSearchProblem with compact states.
+
+    A state is a tuple ( cellIndex, foodMask ) of two integers: the index of
+    Pacman's cell in self.cells, and a bitmask over the food present at the
+    start, where bit i stands for self.foodCells[i].  Successors are looked up
+    in a table built once, eating clears a single bit, and hashing or comparing
+    states is integer work.  Use getPosition, getFoodList and decodeState to
+    read a state, e.g. from a heuristic written for FoodSearchProblem.
+    """
+    def __init__(self, startingGameState):
+        FoodSearchProblem.__init__(self, startingGameState)
+        self.cells = self.walls.asList(False)
+        self.cellIndex = dict((cell, i) for i, cell in enumerate(self.cells))
+
+        # For every cell: (neighbor index, action, mask that clears the neighbor's food)
+        self.successorTable = []
+        for x, y in self.cells:
+            moves = []
+            for direction in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
+                dx, dy = Actions.directionToVector(direction)
+                nextCell = (int(x + dx), int(y + dy))
+                if nextCell in self.cellIndex:
+                    keep = ~self.foodBits.get(nextCell, 0)
+                    moves.append((self.cellIndex[nextCell], direction, keep))
+            self.successorTable.append(tuple(moves))
+
+        self.compactStart = (self.cellIndex[self.start[0]], (1 << len(self.foodCells)) - 1)
+
+    def getStartState(self):
+        return self.compactStart
+
+    def isGoalState(self, state):
+        return state[1] == 0
+
+    def getSuccessors(self, state):
+        "Returns successor states, the actions they require, and a cost of 1."
+        self._expanded += 1 # DO NOT CHANGE
+        cell, foodMask = state
+        return [((nextCell, foodMask & keep), direction, 1)
+                for nextCell, direction, keep in self.successorTable[cell]]
+
+    def getPosition(self, state):
+        return self.cells[state[0]]
+
+    def getPositionAndFoodMask(self, state):
+        return self.cells[state[0]], state[1]
+
+    def getFoodList(self, state):
+        "Returns the positions of the food left in a compact state"
+        foodMask = state[1]
+        return [cell for i, cell in enumerate(self.foodCells) if foodMask >> i & 1]
+
+    def decodeState(self, state):
+        "Returns the ( pacmanPosition, foodGrid ) state of a FoodSearchProblem"
+        foodGrid = self.start[1].copy()
+        for cell in self.foodCells:
+            foodGrid[cell[0]][cell[1]] = False
+        for x, y in self.getFoodList(state):
+            foodGrid[x][y] = True
+        return (self.getPosition(state), foodGrid)
+
+# Number of heuristic values a FoodHeuristicToolkit remembers
+FOOD_HEURISTIC_CACHE_SIZE = 200000
+
+class FoodHeuristicToolkit:
+    """
+    Building blocks for heuristics of a FoodSearchProblem (or a
+    CompactFoodSearchProblem), shared by every call through
+    problem.getHeuristicToolkit():
+
+      foodDistance(i, j):     maze distance between food i and food j
+      nearestFoodDistance:    maze distance from a position to the closest food
+      spanningTreeWeight:     weight of a minimum spanning tree over the food
+                              of a mask, cached per mask
+      value(state):           nearest food plus spanning tree, cached for the
+                              most recently used states
+
+    Food is numbered as in problem.foodCells and sets of food are bitmasks.
+    All distances come from the layout's precomputed distance table.
+    """
+    def __init__(self, problem, cacheSize=FOOD_HEURISTIC_CACHE_SIZE):
+        self.problem = problem
+        self.layout = problem.startingGameState.data.layout
+        self.foodCells = problem.foodCells
+        self.foodDistances = [[self.mazeDistance(a, b) for b in self.foodCells] for a in self.foodCells]
+        self.spanningTrees = {0: 0}
+        self.cacheSize = cacheSize
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def mazeDistance(self, pos1, pos2):
+        # Unreachable food is left out of the bound, which keeps it admissible
+        distance = self.layout.distance(pos1, pos2)
+        if distance is None: return 0
+        return distance
+
+    def foodDistance(self, i, j):
+        return self.foodDistances[i][j]
+
+    def foodIndices(self, foodMask):
+        indices = []
+        i = 0
+        while foodMask:
+            if foodMask & 1:
+                indices.append(i)
+            foodMask >>= 1
+            i += 1
+        return indices
+
+    def nearestFoodDistance(self, position, foodMask):
+        if foodMask == 0: return 0
+        return min([self.mazeDistance(position, self.foodCells[i]) for i in self.foodIndices(foodMask)])
+
+    def spanningTreeWeight(self, foodMask):
+        """
+        Returns the weight of a minimum spanning tree over the food of the
+        mask (Prim's algorithm).  Moves that eat nothing keep the mask, so
+        most lookups are answered from the cache.
+
+        The tree is not updated incrementally: removing a pellet can split it,
+        and reconnecting the parts costs about as much as rebuilding.  Each
+        mask's tree is built once instead, over at most as many pellets as
+        there are left.
+        """
+        if foodMask in self.spanningTrees:
+            return self.spanningTrees[foodMask]
+        indices = self.foodIndices(foodMask)
+        distances = self.foodDistances
+        first = indices[0]
+        best = dict((i, distances[first][i]) for i in indices[1:])
+        weight = 0
+        while best:
+            nearest = min(best, key=best.get)
+            weight += best.pop(nearest)
+            row = distances[nearest]
+            for i in best:
+                if row[i] < best[i]:
+                    best[i] = row[i]
+        self.spanningTrees[foodMask] = weight
+        return weight
+
+    def value(self, state):
+        """
+        Returns the distance to the nearest food plus the spanning tree weight
+        of all the food left.  Any plan has to reach some food first and then
+        connect all of it, so the bound is admissible, and it is consistent.
+        """
+        if state in self.cache:
+            self.hits += 1
+            self.cache.move_to_end(state)
+            return self.cache[state]
+        self.misses += 1
+        position, foodMask = self.problem.getPositionAndFoodMask(state)
+        value = self.nearestFoodDistance(position, foodMask) + self.spanningTreeWeight(foodMask)
+        self.cache[state] = value
+        if len(self.cache) > self.cacheSize:
+            self.cache.popitem(last=False)
+        return value
+
 class AStarFoodSearchAgent(SearchAgent):
     "A SearchAgent for FoodSearchProblem using A* and your foodHeuristic"
     def __init__(self):
@@ -452,24 +727,22 @@ def foodHeuristic(state, problem):
     Subsequent calls to this heuristic can access
     problem.heuristicInfo['wallCount']
     """
-    position, foodGrid = state
-    "*** YOUR CODE HERE ***"
-    return 0
+    return problem.getHeuristicToolkit().value(state)
 
 class ClosestDotSearchAgent(SearchAgent):
     "Search for all food using a sequence of searches"
     def registerInitialState(self, state):
-        self.actions = []
-        currentState = state
-        while(currentState.getFood().count() > 0):
-            nextPathSegment = self.findPathToClosestDot(currentState) # The missing piece
-            self.actions += nextPathSegment
-            for action in nextPathSegment:
-                legal = currentState.getLegalActions()
-                if action not in legal:
-                    t = (str(action), str(currentState))
-                    raise Exception('findPathToClosestDot returned an illegal move: %s!\n%s' % t)
-                currentState = currentState.generateSuccessor(0, action)
+        engine = ClosestDotEngine(state.getWalls(), state.getFood())
+        self.actions = engine.planAllFood(state.getPacmanPosition())
+        # Check the plan with position arithmetic instead of game states
+        walls = state.getWalls()
+        x, y = state.getPacmanPosition()
+        for action in self.actions:
+            dx, dy = Actions.directionToVector(action)
+            x, y = int(x + dx), int(y + dy)
+            if walls[x][y]:
+                t = (str(action), str(state))
+                raise Exception('findPathToClosestDot returned an illegal move: %s!\n%s' % t)
         self.actionIndex = 0
         print('Path found with cost %d.' % len(self.actions))
 
@@ -478,14 +751,75 @@ class ClosestDotSearchAgent(SearchAgent):
         Returns a path (a list of actions) to the closest dot, starting from
         gameState.
         """
-        # Here are some useful elements of the startState
-        startPosition = gameState.getPacmanPosition()
-        food = gameState.getFood()
-        walls = gameState.getWalls()
-        problem = AnyFoodSearchProblem(gameState)
+        engine = ClosestDotEngine(gameState.getWalls(), gameState.getFood())
+        return engine.pathToClosestDot(gameState.getPacmanPosition())
 
-        "*** YOUR CODE HERE ***"
-        util.raiseNotDefined()
+class ClosestDotEngine:
+    """
+    Finds paths to the closest remaining dot with one breadth first search
+    over the open cells of the wall grid, which stops at the first dot it
+    reaches.  The engine keeps track of the food that is left, so a whole
+    greedy plan needs no game states and no AnyFoodSearchProblem.
+
+    Neighbors are tried in the order of PositionSearchProblem.getSuccessors,
+    so ties are broken as breadthFirstSearch on an AnyFoodSearchProblem
+    breaks them.
+    """
+    def __init__(self, walls, food):
+        self.cells = walls.asList(False)
+        self.cellIndex = dict((cell, i) for i, cell in enumerate(self.cells))
+        # For every cell: (neighbor index, action)
+        self.neighbors = []
+        for x, y in self.cells:
+            moves = []
+            for action in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
+                dx, dy = Actions.directionToVector(action)
+                nextCell = (int(x + dx), int(y + dy))
+                if nextCell in self.cellIndex:
+                    moves.append((self.cellIndex[nextCell], action))
+            self.neighbors.append(moves)
+        self.isFood = [False] * len(self.cells)
+        for cell in food.asList():
+            self.isFood[self.cellIndex[cell]] = True
+        self.foodLeft = food.count()
+
+    def pathToClosestDot(self, position):
+        """
+        Returns the actions of a shortest path from the position to the
+        closest remaining dot and eats that dot, or None if no dot can be
+        reached.
+        """
+        start = self.cellIndex[position]
+        parents = {start: None}
+        frontier = deque([start])
+        while frontier:
+            cell = frontier.popleft()
+            if self.isFood[cell]:
+                self.isFood[cell] = False
+                self.foodLeft -= 1
+                actions = []
+                while parents[cell] is not None:
+                    cell, action = parents[cell]
+                    actions.append(action)
+                actions.reverse()
+                return actions
+            for neighbor, action in self.neighbors[cell]:
+                if neighbor not in parents:
+                    parents[neighbor] = (cell, action)
+                    frontier.append(neighbor)
+        return None
+
+    def planAllFood(self, position):
+        "Returns the actions that greedily eat all the reachable food in turn"
+        actions = []
+        while self.foodLeft > 0:
+            segment = self.pathToClosestDot(position)
+            if segment is None: break
+            for action in segment:
+                dx, dy = Actions.directionToVector(action)
+                position = (int(position[0] + dx), int(position[1] + dy))
+            actions += segment
+        return actions
 
 class AnyFoodSearchProblem(PositionSearchProblem):
     """
@@ -519,15 +853,13 @@ class AnyFoodSearchProblem(PositionSearchProblem):
         complete the problem definition.
         """
         x,y = state
-
-        "*** YOUR CODE HERE ***"
-        util.raiseNotDefined()
+        return self.food[x][y]
 
 def mazeDistance(point1, point2, gameState):
     """
-    Returns the maze distance between any two points, using the search functions
-    you have already built. The gameState can be any game state -- Pacman's
-    position in that state is ignored.
+    Returns the maze distance between any two points, looked up in the
+    layout's precomputed distance table (see Layout.distance). The gameState
+    can be any game state -- Pacman's position in that state is ignored.
 
     Example usage: mazeDistance( (2,4), (5,6), gameState)
 
@@ -538,5 +870,6 @@ def mazeDistance(point1, point2, gameState):
     walls = gameState.getWalls()
     assert not walls[x1][y1], 'point1 is a wall: ' + str(point1)
     assert not walls[x2][y2], 'point2 is a wall: ' + str(point2)
-    prob = PositionSearchProblem(gameState, start=point1, goal=point2, warn=False, visualize=False)
-    return len(search.bfs(prob))
+    distance = gameState.data.layout.distance(point1, point2)
+    if distance is None: return 0  # No path: the same as the empty plan a search returns
+    return distance
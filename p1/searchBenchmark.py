@@ -0,0 +1,84 @@
+# searchBenchmark.py
+# ------------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Compares search functions on the PositionSearchProblem of maze layouts: the
+number of expanded nodes, the path cost and the wall-clock time of each.
+
+    > python searchBenchmark.py -l bigMaze,openMaze -r 5
+
+By default Jump Point Search is compared against A* with the Manhattan
+heuristic.  Timings are noisy on a shared machine, so the best of several
+repeats is reported.
+"""
+
+import sys
+import time
+
+import layout
+import search
+import searchAgents
+from pacman import GameState
+
+
+def benchmarkSearch(lay, fn, heuristic, repeat):
+    """
+    Solves the PositionSearchProblem of the layout with search function fn
+    and returns (expanded nodes, path cost, best time in seconds).  The
+    heuristic is only given to functions that take one.
+    """
+    gameState = GameState()
+    gameState.initialize(lay, 0)
+    bestTime = None
+    for i in range(repeat):
+        problem = searchAgents.PositionSearchProblem(gameState, warn=False, visualize=False)
+        start = time.time()
+        if 'heuristic' in fn.__code__.co_varnames:
+            actions = fn(problem, heuristic=heuristic)
+        else:
+            actions = fn(problem)
+        elapsed = time.time() - start
+        if bestTime is None or elapsed < bestTime:
+            bestTime = elapsed
+    return problem._expanded, problem.getCostOfActions(actions), bestTime
+
+
+def readCommand(argv):
+    from optparse import OptionParser
+    parser = OptionParser('USAGE:      python searchBenchmark.py <options>')
+    parser.add_option('-l', '--layouts', dest='layouts', default='mediumMaze,bigMaze,openMaze',
+                      help='comma separated LAYOUT_FILEs to benchmark on [Default: %default]')
+    parser.add_option('-f', '--functions', dest='functions', default='aStarSearch,jumpPointSearch',
+                      help='comma separated search functions in search.py to compare [Default: %default]')
+    parser.add_option('--heuristic', dest='heuristic', default='manhattanHeuristic',
+                      help='the heuristic in searchAgents.py given to the functions that take one [Default: %default]')
+    parser.add_option('-r', '--repeat', dest='repeat', type='int', default=3,
+                      help='how many times to repeat each search [Default: %default]')
+    options, otherjunk = parser.parse_args(argv)
+    if len(otherjunk) != 0:
+        raise Exception('Command line input not understood: ' + str(otherjunk))
+    return options
+
+
+if __name__ == '__main__':
+    options = readCommand(sys.argv[1:])
+    heuristic = getattr(searchAgents, options.heuristic)
+    print('%-14s %-18s %10s %6s %10s' % ('Layout', 'Function', 'Expanded', 'Cost', 'Time'))
+    for layoutName in options.layouts.split(','):
+        lay = layout.getLayout(layoutName)
+        if lay == None:
+            raise Exception("The layout " + layoutName + " cannot be found")
+        for fnName in options.functions.split(','):
+            expanded, cost, elapsed = benchmarkSearch(lay, getattr(search, fnName), heuristic, options.repeat)
+            print('%-14s %-18s %10d %6d %9.2fms' % (layoutName, fnName, expanded, cost, elapsed * 1000))
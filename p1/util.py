@@ -173,37 +173,72 @@ class PriorityQueue:
       has a priority associated with it and the client is usually interested
       in quick retrieval of the lowest-priority item in the queue. This
       data structure allows O(1) access to the lowest-priority item.
+
+      Entries are kept in a binary heap ordered by (priority, count), so ties
+      are broken in insertion order.  An entry map from item to its live heap
+      entry lets update() and contains() run without scanning the heap:
+      superseded entries are marked as removed and skipped lazily by pop().
+      Items passed to update() and contains() must be hashable.
     """
+    REMOVED = object()  # placeholder for the item of a superseded entry
+
     def  __init__(self):
         self.heap = []
+        self.entries = {}
         self.count = 0
+        self.size = 0
 
     def push(self, item, priority):
-        entry = (priority, self.count, item)
+        entry = [priority, self.count, item]
         heapq.heappush(self.heap, entry)
         self.count += 1
+        self.size += 1
+        try:
+            self.entries[item] = entry
+        except TypeError:
+            pass  # unhashable items can still be pushed and popped
 
     def pop(self):
-        (_, _, item) = heapq.heappop(self.heap)
+        while True:
+            entry = heapq.heappop(self.heap)
+            item = entry[2]
+            if item is not self.REMOVED:
+                break
+        self.size -= 1
+        try:
+            if self.entries.get(item) is entry:
+                del self.entries[item]
+        except TypeError:
+            pass
         return item
 
     def isEmpty(self):
-        return len(self.heap) == 0
+        return self.size == 0
+
+    def contains(self, item):
+        "Returns true if 'item' is waiting in the queue"
+        return item in self.entries
 
     def update(self, item, priority):
-        # If item already in priority queue with higher priority, update its priority and rebuild the heap.
+        # If item already in priority queue with higher priority, update its priority.
         # If item already in priority queue with equal or lower priority, do nothing.
         # If item not in priority queue, do the same thing as self.push.
-        for index, (p, c, i) in enumerate(self.heap):
-            if i == item:
-                if p <= priority:
-                    break
-                del self.heap[index]
-                self.heap.append((priority, c, item))
-                heapq.heapify(self.heap)
-                break
-        else:
+        entry = self.entries.get(item)
+        if entry is None:
             self.push(item, priority)
+        elif priority < entry[0]:
+            # Retire the old entry and re-insert with its original count so
+            # that FIFO tie-breaking is preserved.
+            entry[2] = self.REMOVED
+            newEntry = [priority, entry[1], item]
+            heapq.heappush(self.heap, newEntry)
+            self.entries[item] = newEntry
+
+    def peekPriority(self):
+        "Returns the priority of the item that pop() would return next"
+        while self.heap[0][2] is self.REMOVED:
+            heapq.heappop(self.heap)
+        return self.heap[0][0]
 
 class PriorityQueueWithFunction(PriorityQueue):
     """
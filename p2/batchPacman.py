@@ -0,0 +1,225 @@
+# batchPacman.py
+# --------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+A batch of classic Pacman games stepped in lockstep with NumPy (which this
+module requires, unlike the rest of the project).
+
+Every game in a BatchGameState starts from the same layout.  The state of all
+games lives in arrays with a leading batch dimension, and the rules of
+pacman.py (PacmanRules, GhostRules and the scoring constants) are applied to
+the whole batch at once: legality checks, movement, eating, scared timers and
+collisions are array operations.  Given the same action sequences, every game
+ends with the same score, outcome and board as with GameState.generateSuccessor.
+
+Positions are stored in half-cell units, so that the half-speed moves of
+scared ghosts stay exact integers.  Actions are indices into ACTIONS.
+
+    > batch = BatchGameState(layout.getLayout('mediumClassic'), 1000)
+    > while not batch.isOver().all():
+    >     for agentIndex in range(batch.getNumAgents()):
+    >         batch.step(agentIndex, batch.randomActions(agentIndex, rng))
+"""
+
+import numpy as np
+
+from game import Actions, Directions
+from pacman import (COLLISION_TOLERANCE, SCARED_TIME, TIME_PENALTY,
+                    GhostRules, PacmanRules)
+
+ACTIONS = [direction for direction, vector in Actions._directionsAsList]
+ACTION_INDEX = dict((direction, i) for i, direction in enumerate(ACTIONS))
+STOP = ACTION_INDEX[Directions.STOP]
+VECTORS = np.array([vector for direction, vector in Actions._directionsAsList])
+REVERSE = np.array([ACTION_INDEX[Actions.reverseDirection(direction)]
+                    for direction in ACTIONS])
+
+# Score changes applied by PacmanRules.consume and GhostRules.collide
+FOOD_SCORE = 10
+WIN_SCORE = 500
+GHOST_SCORE = 200
+DEATH_SCORE = -500
+
+# Distances and speeds in half-cell units
+PACMAN_STEP = int(PacmanRules.PACMAN_SPEED * 2)
+GHOST_STEP = int(GhostRules.GHOST_SPEED * 2)
+KILL_DISTANCE = int(COLLISION_TOLERANCE * 2)
+
+
+def gridToArray(grid):
+    "Returns a game.Grid as a (width, height) boolean array"
+    array = np.zeros((grid.width, grid.height), dtype=bool)
+    for x, y in grid.asList():
+        array[x, y] = True
+    return array
+
+
+class BatchGameState:
+    """
+    The states of batchSize games on one layout, with GameState's rules.
+
+    Arrays (B is the batch size, A the number of agents):
+      walls:         (W, H) bool, shared by every game
+      food:          (B, W, H) bool
+      capsules:      (B, W, H) bool
+      positions:     (B, A, 2) int, in half cells
+      directions:    (B, A) int, indices into ACTIONS
+      scaredTimers:  (B, A) int
+      scores:        (B,) int
+      wins, losses:  (B,) bool
+    """
+
+    def __init__(self, layout, batchSize, numGhostAgents=1000):
+        # Agents are chosen as in GameStateData.initialize
+        starts = []
+        numGhosts = 0
+        for isPacman, pos in layout.agentPositions:
+            if not isPacman:
+                if numGhosts == numGhostAgents:
+                    continue
+                numGhosts += 1
+            starts.append(pos)
+
+        self.batchSize = batchSize
+        self.walls = gridToArray(layout.walls)
+        self.food = np.repeat(gridToArray(layout.food)[np.newaxis], batchSize, axis=0)
+        self.capsules = np.zeros_like(self.food)
+        for x, y in layout.capsules:
+            self.capsules[:, x, y] = True
+        self.startPositions = np.array(starts, dtype=int) * 2
+        self.positions = np.repeat(self.startPositions[np.newaxis], batchSize, axis=0)
+        self.directions = np.full((batchSize, len(starts)), STOP, dtype=int)
+        self.scaredTimers = np.zeros((batchSize, len(starts)), dtype=int)
+        self.scores = np.zeros(batchSize, dtype=int)
+        self.wins = np.zeros(batchSize, dtype=bool)
+        self.losses = np.zeros(batchSize, dtype=bool)
+        self._games = np.arange(batchSize)
+
+    def getNumAgents(self):
+        return self.positions.shape[1]
+
+    def getNumFood(self):
+        return self.food.sum(axis=(1, 2))
+
+    def isOver(self):
+        return self.wins | self.losses
+
+    def getLegalActions(self, agentIndex):
+        """
+        Returns a (B, len(ACTIONS)) mask of the legal actions of the agent in
+        every game, following PacmanRules.getLegalActions and
+        GhostRules.getLegalActions.  Finished games have no legal actions.
+        """
+        x2 = self.positions[:, agentIndex, 0]
+        y2 = self.positions[:, agentIndex, 1]
+        direction = self.directions[:, agentIndex]
+
+        # Between grid points an agent can only keep going straight
+        onGrid = ((x2 | y2) & 1) == 0
+        x = (x2 + 1) // 2
+        y = (y2 + 1) // 2
+        free = ~self.walls[x[:, np.newaxis] + VECTORS[:, 0],
+                           y[:, np.newaxis] + VECTORS[:, 1]]
+        straight = np.arange(len(ACTIONS)) == direction[:, np.newaxis]
+        legal = np.where(onGrid[:, np.newaxis], free, straight)
+
+        if agentIndex > 0:
+            # Ghosts cannot stop, and only turn around at dead ends
+            legal[:, STOP] = False
+            reverse = REVERSE[direction]
+            turnAround = legal[self._games, reverse] & (legal.sum(axis=1) > 1)
+            legal[self._games[turnAround], reverse[turnAround]] = False
+
+        legal[self.isOver()] = False
+        return legal
+
+    def randomActions(self, agentIndex, rng):
+        """
+        Picks a uniformly random legal action for the agent in every game, as
+        a RandomGhost would.  Finished games get STOP.
+        """
+        legal = self.getLegalActions(agentIndex)
+        choice = np.where(legal, rng.random(legal.shape), -1.0).argmax(axis=1)
+        choice[self.isOver()] = STOP
+        return choice
+
+    def step(self, agentIndex, actions):
+        """
+        Applies one action per game for the agent, like generateSuccessor does
+        for a single GameState.  Actions of finished games are ignored.
+        """
+        actions = np.asarray(actions)
+        active = ~self.isOver()
+        legal = self.getLegalActions(agentIndex)[self._games, actions]
+        if not legal[active].all():
+            bad = np.flatnonzero(active & ~legal)[0]
+            raise Exception('Illegal action %s for agent %d in game %d' %
+                            (ACTIONS[actions[bad]], agentIndex, bad))
+
+        games = self._games[active]
+        actions = actions[active]
+        scoreChange = np.zeros(self.batchSize, dtype=int)
+
+        # Move; a stopped agent keeps its direction
+        if agentIndex == 0:
+            step = PACMAN_STEP
+        else:
+            step = np.where(self.scaredTimers[games, agentIndex] > 0,
+                            GHOST_STEP // 2, GHOST_STEP)[:, np.newaxis]
+        self.positions[games, agentIndex] += VECTORS[actions] * step
+        moving = actions != STOP
+        self.directions[games[moving], agentIndex] = actions[moving]
+
+        if agentIndex == 0:
+            # Eat food and capsules at Pacman's (always whole-cell) position
+            x = self.positions[games, 0, 0] // 2
+            y = self.positions[games, 0, 1] // 2
+            ate = self.food[games, x, y]
+            self.food[games[ate], x[ate], y[ate]] = False
+            scoreChange[games[ate]] += FOOD_SCORE
+            cleared = games[ate][self.getNumFood()[games[ate]] == 0]
+            scoreChange[cleared] += WIN_SCORE
+            self.wins[cleared] = True
+
+            ate = self.capsules[games, x, y]
+            self.capsules[games[ate], x[ate], y[ate]] = False
+            self.scaredTimers[games[ate], 1:] = SCARED_TIME
+
+            scoreChange[games] -= TIME_PENALTY
+            ghosts = range(1, self.getNumAgents())
+        else:
+            # A scared timer running out snaps the ghost back onto the grid
+            timers = self.scaredTimers[games, agentIndex]
+            ending = games[timers == 1]
+            self.positions[ending, agentIndex] = \
+                (self.positions[ending, agentIndex] + 1) // 2 * 2
+            self.scaredTimers[games, agentIndex] = np.maximum(0, timers - 1)
+            ghosts = [agentIndex]
+
+        # Resolve collisions as GhostRules.checkDeath does
+        for ghost in ghosts:
+            distance = np.abs(self.positions[games, ghost] -
+                              self.positions[games, 0]).sum(axis=1)
+            hit = games[distance <= KILL_DISTANCE]
+            scared = self.scaredTimers[hit, ghost] > 0
+            eaten = hit[scared]
+            scoreChange[eaten] += GHOST_SCORE
+            self.positions[eaten, ghost] = self.startPositions[ghost]
+            self.directions[eaten, ghost] = STOP
+            self.scaredTimers[eaten, ghost] = 0
+            killed = hit[~scared & ~self.wins[hit]]
+            scoreChange[killed] += DEATH_SCORE
+            self.losses[killed] = True
+
+        self.scores += scoreChange
@@ -171,9 +171,14 @@ class AgentState:
 
 class Grid:
     """
-    A 2-dimensional array of objects backed by a list of lists.  Data is accessed
-    via grid[x][y] where (x,y) are positions on a Pacman map with x horizontal,
-    y vertical and the origin (0,0) in the bottom left corner.
+    A 2-dimensional array of booleans backed by a single integer bitmask.  Data
+    is accessed via grid[x][y] where (x,y) are positions on a Pacman map with x
+    horizontal, y vertical and the origin (0,0) in the bottom left corner.
+
+    Cell (x,y) is bit x * height + y of self.bits, so copying, hashing and
+    comparing a grid are integer operations and count() is a popcount.  Reads
+    go through GridColumn lists that are built on first access; code that
+    assigns self.bits directly must reset self._columns.
 
     The __str__ method constructs an output that is oriented like a pacman board.
     """
@@ -185,19 +190,30 @@ class Grid:
 
         self.width = width
         self.height = height
-        self.data = [[initialValue for y in range(
-            height)] for x in range(width)]
+        self.bits = (1 << (width * height)) - 1 if initialValue else 0
+        self._columns = [None] * width
         if bitRepresentation:
             self._unpackBits(bitRepresentation)
 
-    def __getitem__(self, i):
-        return self.data[i]
+    def __getitem__(self, x):
+        column = self._columns[x]
+        if column is None:
+            column = GridColumn(self, x % self.width)
+            self._columns[x] = column
+        return column
 
     def __setitem__(self, key, item):
-        self.data[key] = item
+        column = self[key]
+        for y, value in enumerate(item):
+            column[y] = value
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_columns'] = [None] * self.width
+        return state
 
     def __str__(self):
-        out = [[str(self.data[x][y])[0] for x in range(self.width)]
+        out = [[str(self[x][y])[0] for x in range(self.width)]
                for y in range(self.height)]
         out.reverse()
         return '\n'.join([''.join(x) for x in out])
@@ -205,41 +221,42 @@ class Grid:
     def __eq__(self, other):
         if other == None:
             return False
-        return self.data == other.data
+        return (self.bits == other.bits and self.width == other.width
+                and self.height == other.height)
 
     def __hash__(self):
-        # return hash(str(self))
-        base = 1
-        h = 0
-        for l in self.data:
-            for i in l:
-                if i:
-                    h += base
-                base *= 2
-        return hash(h)
+        return hash(self.bits)
 
     def copy(self):
         g = Grid(self.width, self.height)
-        g.data = [x[:] for x in self.data]
+        g.bits = self.bits
         return g
 
     def deepCopy(self):
         return self.copy()
 
     def shallowCopy(self):
-        g = Grid(self.width, self.height)
-        g.data = self.data
-        return g
+        # A shallow copy shares its cells with the original, so successors can
+        # hold the same Grid until one of them eats a pellet and calls copy().
+        return self
 
     def count(self, item=True):
-        return sum([x.count(item) for x in self.data])
+        n = bin(self.bits).count('1')
+        if item:
+            return n
+        return self.width * self.height - n
 
     def asList(self, key=True):
+        bits = self.bits
+        if not key:
+            bits ^= (1 << (self.width * self.height)) - 1
         list = []
-        for x in range(self.width):
-            for y in range(self.height):
-                if self[x][y] == key:
-                    list.append((x, y))
+        height = self.height
+        while bits:
+            low = bits & -bits
+            i = low.bit_length() - 1
+            list.append((i // height, i % height))
+            bits ^= low
         return list
 
     def packBits(self):
@@ -252,8 +269,7 @@ class Grid:
         currentInt = 0
         for i in range(self.height * self.width):
             bit = self.CELLS_PER_INT - (i % self.CELLS_PER_INT) - 1
-            x, y = self._cellIndexToPosition(i)
-            if self[x][y]:
+            if (self.bits >> i) & 1:
                 currentInt += 2 ** bit
             if (i + 1) % self.CELLS_PER_INT == 0:
                 bits.append(currentInt)
@@ -262,7 +278,7 @@ class Grid:
         return tuple(bits)
 
     def _cellIndexToPosition(self, index):
-        x = index / self.height
+        x = index // self.height
         y = index % self.height
         return x, y
 
@@ -275,8 +291,10 @@ class Grid:
             for bit in self._unpackInt(packed, self.CELLS_PER_INT):
                 if cell == self.width * self.height:
                     break
-                x, y = self._cellIndexToPosition(cell)
-                self[x][y] = bit
+                if bit:
+                    self.bits |= 1 << cell
+                else:
+                    self.bits &= ~(1 << cell)
                 cell += 1
 
     def _unpackInt(self, packed, size):
@@ -293,6 +311,32 @@ class Grid:
         return bools
 
 
+class GridColumn(list):
+    """
+    Column x of a Grid as a list of booleans, so that grid[x][y] reads are
+    plain list indexing.  Writes also update the grid's bitmask, which keeps
+    the two in sync.
+    """
+
+    __slots__ = ('grid', 'offset')
+
+    def __init__(self, grid, x):
+        self.grid = grid
+        self.offset = x * grid.height
+        bits = grid.bits >> self.offset
+        list.__init__(self, [(bits >> y) & 1 == 1 for y in range(grid.height)])
+
+    def __setitem__(self, y, value):
+        value = bool(value)
+        list.__setitem__(self, y, value)
+        if y < 0:
+            y += len(self)
+        if value:
+            self.grid.bits |= 1 << (self.offset + y)
+        else:
+            self.grid.bits &= ~(1 << (self.offset + y))
+
+
 def reconstituteGrid(bitRep):
     if type(bitRep) is not type((1, 2)):
         return bitRep
@@ -398,11 +442,16 @@ class GameStateData:
     def __init__(self, prevState=None):
         """
         Generates a new data packet by copying information from its predecessor.
+
+        The food grid, the capsule list and the agent states are shared with
+        the predecessor.  Code that modifies one of them must first take a
+        private copy (see copyAgentState), so that a successor only pays for
+        the parts of the state that actually change.
         """
         if prevState != None:
             self.food = prevState.food.shallowCopy()
-            self.capsules = prevState.capsules[:]
-            self.agentStates = self.copyAgentStates(prevState.agentStates)
+            self.capsules = prevState.capsules
+            self.agentStates = prevState.agentStates[:]
             self.layout = prevState.layout
             self._eaten = prevState._eaten
             self.score = prevState.score
@@ -411,6 +460,7 @@ class GameStateData:
         self._foodAdded = None
         self._capsuleEaten = None
         self._agentMoved = None
+        self.features = None  # Set by generateSuccessor, see multiAgents.EvaluationFeatures
         self._lose = False
         self._win = False
         self.scoreChange = 0
@@ -418,11 +468,14 @@ class GameStateData:
     def deepCopy(self):
         state = GameStateData(self)
         state.food = self.food.deepCopy()
+        state.capsules = self.capsules[:]
+        state.agentStates = self.copyAgentStates(self.agentStates)
         state.layout = self.layout.deepCopy()
         state._agentMoved = self._agentMoved
         state._foodEaten = self._foodEaten
         state._foodAdded = self._foodAdded
         state._capsuleEaten = self._capsuleEaten
+        state.features = self.features
         return state
 
     def copyAgentStates(self, agentStates):
@@ -431,6 +484,15 @@ class GameStateData:
             copiedStates.append(agentState.copy())
         return copiedStates
 
+    def copyAgentState(self, agentIndex):
+        """
+        Replaces the agent state at agentIndex with a private copy and returns
+        it.  Call this before modifying an agent state of a successor.
+        """
+        agentState = self.agentStates[agentIndex].copy()
+        self.agentStates[agentIndex] = agentState
+        return agentState
+
     def __eq__(self, other):
         """
         Allows two states to be compared.
@@ -462,7 +524,7 @@ class GameStateData:
 
     def __str__(self):
         width, height = self.layout.width, self.layout.height
-        map = Grid(width, height)
+        map = [[' ' for y in range(height)] for x in range(width)]
         if type(self.food) == type((1, 2)):
             self.food = reconstituteGrid(self.food)
         for x in range(width):
@@ -485,7 +547,10 @@ class GameStateData:
         for x, y in self.capsules:
             map[x][y] = 'o'
 
-        return str(map) + ("\nScore: %d\n" % self.score)
+        out = [''.join([map[x][y] for x in range(width)])
+               for y in range(height)]
+        out.reverse()
+        return '\n'.join(out) + ("\nScore: %d\n" % self.score)
 
     def _foodWallStr(self, hasFood, hasWall):
         if hasFood:
@@ -776,3 +841,46 @@ class Game:
                     self.unmute()
                     return
         self.display.finish()
+
+    def runHeadless(self):
+        """
+        Fast control loop for trusted agents and no display.
+
+        Agents are handed the game state itself instead of a deep copy (which
+        also re-parses the layout), and there is no output muting, exception
+        catching or move timing.  Agents must therefore not modify the states
+        they are given, and (with GameState.checkActions off, as pacman.py
+        --headless sets it) their actions are not checked to be legal.  For
+        the same random seed the move history is the same as the one run()
+        produces.
+        """
+        self.numMoves = 0
+        agents = self.agents
+        for agent in agents:
+            registerInitialState = getattr(agent, 'registerInitialState', None)
+            if registerInitialState is not None:
+                registerInitialState(self.state)
+
+        observers = [getattr(agent, 'observationFunction', None)
+                     for agent in agents]
+        actors = [agent.getAction for agent in agents]
+        agentIndex = self.startingIndex
+        numAgents = len(agents)
+        moveHistory = self.moveHistory
+
+        while not self.gameOver:
+            observe = observers[agentIndex]
+            if observe is not None:
+                action = actors[agentIndex](observe(self.state))
+            else:
+                action = actors[agentIndex](self.state)
+            moveHistory.append((agentIndex, action))
+            state = self.state = self.state.generateSuccessor(agentIndex, action)
+            if state.isWin() or state.isLose():
+                self.rules.process(state, self)
+            agentIndex = (agentIndex + 1) % numAgents
+
+        for agent in agents:
+            final = getattr(agent, 'final', None)
+            if final is not None:
+                final(self.state)
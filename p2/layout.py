@@ -16,9 +16,24 @@ from util import manhattanDistance
 from game import Grid
 import os
 import random
+import hashlib
+import mmap
+import struct
+import tempfile
+from array import array
+from collections import deque
 from functools import reduce
 
 VISIBILITY_MATRIX_CACHE = {}
+DISTANCE_TABLE_CACHE = {}
+UNREACHABLE = 0xFFFF  # Distance table entry for cells that cannot reach each other
+
+# Distance tables can also be saved to disk, one file per layout text, so that
+# later processes can memory-map them instead of recomputing them.  This is
+# off unless PACMAN_LAYOUT_CACHE names the directory to keep them in.
+LAYOUT_CACHE_DIR = os.environ.get('PACMAN_LAYOUT_CACHE', '')
+TABLE_MAGIC = b'PDT1'
+TABLE_HEADER = struct.Struct('<4sIII')  # magic, width, height, number of open cells
 
 
 class Layout:
@@ -37,6 +52,7 @@ class Layout:
         self.processLayoutText(layoutText)
         self.layoutText = layoutText
         self.totalFood = len(self.food.asList())
+        self.distances = None
         # self.initializeVisibilityMatrix()
 
     def getNumGhosts(self):
@@ -66,6 +82,72 @@ class Layout:
             self.visibility = VISIBILITY_MATRIX_CACHE[reduce(
                 str.__add__, self.layoutText)]
 
+    def initializeDistances(self):
+        """
+        Computes the maze distance between every pair of open cells with one
+        breadth first search per cell.  Open cells are numbered in x-major
+        order: self.openCells lists their positions, self.cellIndex maps a
+        position back to its number, self.neighbors lists the numbers of the
+        open cells next to each cell and self.distances is a flat array in
+        which the distance from cell i to cell j is entry i * n + j.
+
+        The tables only depend on the walls, so they are shared by all
+        layouts with the same text and, if enabled, cached on disk (see
+        LAYOUT_CACHE_DIR).
+        """
+        key = '\n'.join(self.layoutText)
+        if key not in DISTANCE_TABLE_CACHE:
+            DISTANCE_TABLE_CACHE[key] = loadDistanceTables(
+                key, self.width, self.height)
+        if DISTANCE_TABLE_CACHE[key] is None:
+            openCells = [(x, y) for x in range(self.width)
+                         for y in range(self.height) if not self.walls[x][y]]
+            cellIndex = dict([(cell, i) for i, cell in enumerate(openCells)])
+            neighbors = []
+            for x, y in openCells:
+                adjacent = [(x, y + 1), (x, y - 1), (x + 1, y), (x - 1, y)]
+                neighbors.append(tuple([cellIndex[cell]
+                                        for cell in adjacent if cell in cellIndex]))
+            n = len(openCells)
+            distances = array('H', [UNREACHABLE]) * (n * n)
+            for source in range(n):
+                row = source * n
+                distances[row + source] = 0
+                frontier = deque([source])
+                while frontier:
+                    cell = frontier.popleft()
+                    nextDistance = distances[row + cell] + 1
+                    for neighbor in neighbors[cell]:
+                        if distances[row + neighbor] == UNREACHABLE:
+                            distances[row + neighbor] = nextDistance
+                            frontier.append(neighbor)
+            DISTANCE_TABLE_CACHE[key] = (openCells, cellIndex, neighbors, distances)
+            saveDistanceTables(key, self.width, self.height,
+                               DISTANCE_TABLE_CACHE[key])
+        self.openCells, self.cellIndex, self.neighbors, self.distances = DISTANCE_TABLE_CACHE[key]
+
+    def distance(self, pos1, pos2):
+        """
+        Returns the maze distance between two open grid positions, or None if
+        there is no path between them.  The distance table is built the first
+        time it is needed.
+        """
+        if self.distances is None:
+            self.initializeDistances()
+        n = len(self.openCells)
+        d = self.distances[self.cellIndex[pos1] * n + self.cellIndex[pos2]]
+        if d == UNREACHABLE:
+            return None
+        return d
+
+    def __getstate__(self):
+        # Memory-mapped tables cannot be pickled; they are reloaded on demand
+        state = self.__dict__.copy()
+        for name in ['openCells', 'cellIndex', 'neighbors']:
+            state.pop(name, None)
+        state['distances'] = None
+        return state
+
     def isWall(self, pos):
         x, col = pos
         return self.walls[x][col]
@@ -137,6 +219,76 @@ class Layout:
             self.numGhosts += 1
 
 
+def distanceTablePath(layoutKey):
+    "Returns the cache file for a layout text, or None if caching is disabled"
+    if not LAYOUT_CACHE_DIR:
+        return None
+    digest = hashlib.sha1(layoutKey.encode('utf-8')).hexdigest()
+    return os.path.join(LAYOUT_CACHE_DIR, digest + '.dist')
+
+
+def saveDistanceTables(layoutKey, width, height, tables):
+    """
+    Writes the tables built by Layout.initializeDistances to the cache.  The
+    file holds a header, the open cells as x * height + y, four neighbour
+    slots per cell (-1 when unused) and the distance matrix.  The sections
+    before the matrix are multiples of 4 bytes long, so every section can be
+    cast in place without padding.  Failures to write are ignored.
+    """
+    path = distanceTablePath(layoutKey)
+    if path == None:
+        return
+    openCells, cellIndex, neighbors, distances = tables
+    cells = array('I', [x * height + y for x, y in openCells])
+    slots = array('i')
+    for adjacent in neighbors:
+        slots.extend(list(adjacent) + [-1] * (4 - len(adjacent)))
+    body = [TABLE_HEADER.pack(TABLE_MAGIC, width, height, len(openCells)),
+            cells.tobytes(), slots.tobytes(), distances.tobytes()]
+    try:
+        if not os.path.isdir(LAYOUT_CACHE_DIR):
+            os.makedirs(LAYOUT_CACHE_DIR)
+        fd, tmpPath = tempfile.mkstemp(dir=LAYOUT_CACHE_DIR)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(b''.join(body))
+        os.replace(tmpPath, path)  # Readers never see a partially written file
+    except (IOError, OSError):
+        pass
+
+
+def loadDistanceTables(layoutKey, width, height):
+    """
+    Memory-maps the cached tables for a layout text read-only.  The distance
+    matrix is used in place, so processes loading the same layout share its
+    pages.  Returns None if there is no valid cache file.
+    """
+    path = distanceTablePath(layoutKey)
+    if path == None or not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'rb') as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (IOError, OSError, ValueError):
+        return None
+    if len(data) < TABLE_HEADER.size:
+        return None
+    magic, cachedWidth, cachedHeight, n = TABLE_HEADER.unpack_from(data, 0)
+    cellsEnd = TABLE_HEADER.size + 4 * n
+    slotsEnd = cellsEnd + 16 * n
+    if ((magic, cachedWidth, cachedHeight) != (TABLE_MAGIC, width, height) or
+            len(data) != slotsEnd + 2 * n * n):
+        return None
+    view = memoryview(data)
+    cells = view[TABLE_HEADER.size:cellsEnd].cast('I')
+    slots = view[cellsEnd:slotsEnd].cast('i')
+    openCells = [(cell // height, cell % height) for cell in cells]
+    cellIndex = dict([(cell, i) for i, cell in enumerate(openCells)])
+    neighbors = [tuple([j for j in slots[4 * i:4 * i + 4] if j >= 0])
+                 for i in range(n)]
+    distances = view[slotsEnd:].cast('H')
+    return (openCells, cellIndex, neighbors, distances)
+
+
 def getLayout(name, back=2):
     if name.endswith('.lay'):
         layout = tryToLoad('layouts/' + name)
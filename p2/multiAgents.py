@@ -14,7 +14,8 @@
 
 from util import manhattanDistance
 from game import Directions
-import random, util
+from collections import OrderedDict, deque
+import heapq, math, random, time, util, weakref
 
 from game import Agent
 
@@ -57,34 +58,30 @@ class ReflexAgent(Agent):
         GameStates (pacman.py) and returns a number, where higher numbers are better.
 
         The code below extracts some useful information from the state, like the
-        remaining food (newFood) and Pacman position after moving (newPos).
+        Pacman position after moving (newPos) and the remaining food and the
+        distances to it and to the ghosts (features, see EvaluationFeatures).
         newScaredTimes holds the number of moves that each ghost will remain
         scared because of Pacman having eaten a power pellet.
 
         Print out these variables to see what you're getting, then combine them
         to create a masterful evaluation function.
         """
-        # Useful information you can extract from a GameState (pacman.py)
+        # Useful information you can extract from a GameState (pacman.py).
+        # The successor inherits incrementally maintained features (food
+        # count and distances) from the current state
+        EvaluationFeatures.attach(currentGameState, 'manhattan')
         successorGameState = currentGameState.generatePacmanSuccessor(action)
         newPos = successorGameState.getPacmanPosition()
-        newFood = successorGameState.getFood()
         newGhostStates = successorGameState.getGhostStates()
         newScaredTimes = [ghostState.scaredTimer for ghostState in newGhostStates]
-
-        # Get a list of food positions and distances
-        foodPositions = newFood.asList()
-        foodDistances = [manhattanDistance(food, newPos) for food in foodPositions]
-
-        # Get the ghost positions and their distances to Pacman
-        ghostPositions = successorGameState.getGhostPositions()
-        ghostDistances = [manhattanDistance(ghost, newPos) for ghost in ghostPositions]
+        features = successorGameState.data.features
 
         # Check if Pacman won (ate all the food)
-        if len(foodDistances) == 0:
+        if features.numFood == 0:
             return float("inf")
 
         # Check if Pacman lost (caught by a ghost)
-        if min(ghostDistances) < 2:
+        if min(features.ghostDistances) < 2:
             return -(float("inf"))
 
         if currentGameState.getPacmanPosition() == newPos:
@@ -95,10 +92,10 @@ class ReflexAgent(Agent):
         if currentGameState.getCapsules():
             score += 5 / (manhattanDistance(currentGameState.getCapsules()[0], newPos) + 1)
 
-        score += 10 / min(foodDistances) + 10000 / (len(foodDistances))
+        score += 10 / features.nearestFood + 10000 / features.numFood
 
         # Encourage Pacman to eat scared ghosts
-        for ghostDistance, scaredTime in zip(ghostDistances, newScaredTimes):
+        for ghostDistance, scaredTime in zip(features.ghostDistances, newScaredTimes):
             if scaredTime > 0:
                 score += 50000 / (ghostDistance + 1)
 
@@ -116,6 +113,287 @@ def scoreEvaluationFunction(currentGameState):
     return currentGameState.getScore()
 
 
+def stateKey(gameState, agentIndex):
+    """
+    Returns a cheap, exact key for a search node: the agent to move, every
+    agent's position, direction and scared timer, the food bitmask, the
+    remaining capsules and the score.  Two nodes with equal keys have the same
+    legal moves, successors and evaluation.
+    """
+    data = gameState.data
+    agents = tuple([(s.configuration.pos, s.configuration.direction, s.scaredTimer)
+                    for s in data.agentStates])
+    return (agentIndex, agents, data.food.bits, tuple(data.capsules), data.score)
+
+
+class EvaluationFeatures:
+    """
+    Evaluation features that are maintained incrementally along a search
+    path instead of being recomputed at every leaf: the number of food
+    pellets left, the distance from Pacman to the closest one and the
+    distance from Pacman to every ghost.
+
+    Features are attached to a state with attach().  From then on
+    GameState.generateSuccessor gives every successor features that are
+    derived from the features of its parent and the changes it records
+    (_foodEaten and _agentMoved) the first time one of them is read, so a
+    state that is generated but never evaluated only gets an empty object:
+
+      * The distance to the closest food is looked up in a field that holds
+        it for every cell.  The field only changes when a pellet is eaten and
+        is shared, through an LRU cache, by all states with the same food.
+        A new field is derived from the parent's by searching again only
+        the cells whose closest pellet was the eaten one.
+      * A ghost move only changes the distance to that ghost; a Pacman move
+        changes the distance to every ghost.
+
+    The metric is 'manhattan' (walls are ignored) or 'maze' (the maze
+    distance of Layout.distance).  Unreachable food or ghosts are at an
+    infinite distance, as is the closest food once all of it is eaten.
+    """
+    # parent and data come last, so that pickling derives the features
+    # before it reaches the parent
+    __slots__ = ('metric', 'field', 'numFood', 'nearestFood', 'ghostDistances', 'parent', 'data')
+
+    METRICS = ('manhattan', 'maze')
+    DERIVED = ('field', 'numFood', 'nearestFood', 'ghostDistances')
+    fieldCache = OrderedDict()
+    fieldCacheSize = 256
+
+    @staticmethod
+    def attach(gameState, metric='manhattan'):
+        """
+        Returns the features of gameState, computing them from scratch unless
+        the state already carries features of the same metric.
+        """
+        features = gameState.data.features
+        if features is None or features.metric != metric:
+            features = EvaluationFeatures(gameState.data, metric)
+            gameState.data.features = features
+        return features
+
+    def __init__(self, data=None, metric='manhattan'):
+        if data is None:
+            return  # Filled in by successor()
+        if metric not in EvaluationFeatures.METRICS:
+            raise Exception('Unknown metric: ' + str(metric))
+        self.metric = metric
+        self.parent = self.data = None
+        self.field = EvaluationFeatures.nearestFoodField(data, metric)
+        self.numFood = data.food.count()
+        self.nearestFood = self.lookupNearestFood(data)
+        self.ghostDistances = [self.ghostDistance(data, index)
+                               for index in range(1, len(data.agentStates))]
+
+    def successor(self, data):
+        """
+        Returns the features of the successor state data, given that these
+        are the features of its parent.  They are only derived when read.
+        """
+        features = EvaluationFeatures()
+        features.metric = self.metric
+        features.parent, features.data = self, data
+        return features
+
+    def __getattr__(self, name):
+        # Only called for the slots that successor() leaves empty
+        if name not in EvaluationFeatures.DERIVED or self.parent is None:
+            raise AttributeError(name)
+        # Derive the unread ancestors first, from the oldest one down
+        pending, features = [], self
+        while features.parent is not None:
+            pending.append(features)
+            features = features.parent
+        for features in reversed(pending):
+            features.derive()
+        return getattr(self, name)
+
+    def derive(self):
+        "Fills in the features from those of the parent, which must be derived"
+        parent, data = self.parent, self.data
+        self.parent = self.data = None  # Lets the ancestors be collected
+        self.field = parent.field
+        self.numFood = parent.numFood
+        if data._foodEaten is not None:
+            self.field = EvaluationFeatures.nearestFoodField(data, self.metric, parent.field)
+            self.numFood -= 1
+        if data._agentMoved == 0:
+            self.nearestFood = self.lookupNearestFood(data)
+            self.ghostDistances = [self.ghostDistance(data, index)
+                                   for index in range(1, len(data.agentStates))]
+        else:
+            self.nearestFood = parent.nearestFood
+            self.ghostDistances = parent.ghostDistances[:]
+            # Only the ghost that moved can change position (checkDeath
+            # sends it back to its start if Pacman eats it)
+            index = data._agentMoved
+            self.ghostDistances[index - 1] = self.ghostDistance(data, index)
+
+    def lookupNearestFood(self, data):
+        x, y = data.agentStates[0].configuration.getPosition()
+        return self.field[int(x) * data.food.height + int(y)]
+
+    def ghostDistance(self, data, index):
+        pacman = data.agentStates[0].configuration.getPosition()
+        ghost = data.agentStates[index].configuration.getPosition()
+        if self.metric == 'manhattan':
+            return manhattanDistance(pacman, ghost)
+        d = data.layout.distance(util.nearestPoint(pacman), util.nearestPoint(ghost))
+        if d is None:
+            return float('inf')
+        return d
+
+    @staticmethod
+    def nearestFoodField(data, metric, parentField=None):
+        """
+        Returns a list holding, for the cell x * height + y, the distance to
+        the closest food of data.food.  It is found with one breadth first
+        search from all pellets at once, or from parentField, the field of
+        the parent state, when data has just eaten a pellet.
+        """
+        food, walls = data.food, data.layout.walls
+        key = (metric, walls.bits, food.height, food.bits)
+        cache = EvaluationFeatures.fieldCache
+        field = cache.get(key)
+        if field is not None:
+            cache.move_to_end(key)
+            return field
+
+        width, height = food.width, food.height
+        blocked = walls.bits if metric == 'maze' else 0
+        if parentField is not None and data._foodEaten is not None:
+            x, y = data._foodEaten
+            field = EvaluationFeatures.removeFood(parentField, x * height + y, width, height, blocked)
+            EvaluationFeatures.cacheField(key, field)
+            return field
+
+        field = [float('inf')] * (width * height)
+        frontier = deque()
+        for x, y in food.asList():
+            field[x * height + y] = 0
+            frontier.append(x * height + y)
+        while frontier:
+            cell = frontier.popleft()
+            nextDistance = field[cell] + 1
+            x, y = divmod(cell, height)
+            for neighbor, inside in ((cell + 1, y + 1 < height), (cell - 1, y > 0),
+                                     (cell + height, x + 1 < width), (cell - height, x > 0)):
+                if inside and field[neighbor] > nextDistance and not (blocked >> neighbor) & 1:
+                    field[neighbor] = nextDistance
+                    frontier.append(neighbor)
+
+        EvaluationFeatures.cacheField(key, field)
+        return field
+
+    @staticmethod
+    def cacheField(key, field):
+        cache = EvaluationFeatures.fieldCache
+        cache[key] = field
+        if len(cache) > EvaluationFeatures.fieldCacheSize:
+            cache.popitem(last=False)
+
+    @staticmethod
+    def removeFood(parentField, eaten, width, height, blocked):
+        """
+        Returns a copy of parentField without the pellet of the cell eaten.
+
+        Only the cells whose distance to the eaten pellet equals their
+        distance to the closest food can get further from food.  They are
+        reached from the eaten cell along the steps where parentField grows
+        by one, and searched again from the cells around them, whose
+        distances do not change.
+        """
+        field = parentField[:]
+
+        def neighbors(cell):
+            x, y = divmod(cell, height)
+            for neighbor, inside in ((cell + 1, y + 1 < height), (cell - 1, y > 0),
+                                     (cell + height, x + 1 < width), (cell - height, x > 0)):
+                if inside and not (blocked >> neighbor) & 1:
+                    yield neighbor
+
+        region, stack = set([eaten]), [eaten]
+        while stack:
+            cell = stack.pop()
+            for neighbor in neighbors(cell):
+                if neighbor not in region and parentField[neighbor] == parentField[cell] + 1:
+                    region.add(neighbor)
+                    stack.append(neighbor)
+
+        frontier = []
+        for cell in region:
+            distance = float('inf')
+            for neighbor in neighbors(cell):
+                if neighbor not in region:
+                    distance = min(distance, parentField[neighbor] + 1)
+            field[cell] = distance
+            if distance < float('inf'):
+                frontier.append((distance, cell))
+        heapq.heapify(frontier)
+        while frontier:
+            distance, cell = heapq.heappop(frontier)
+            if distance > field[cell]:
+                continue
+            for neighbor in neighbors(cell):
+                if neighbor in region and field[neighbor] > distance + 1:
+                    field[neighbor] = distance + 1
+                    heapq.heappush(frontier, (distance + 1, neighbor))
+        return field
+
+
+class SearchTimeout(Exception):
+    """
+    Raised inside a search when the per-move time budget has run out.
+    """
+    pass
+
+
+class TranspositionTable:
+    """
+    A bounded cache of search results keyed by stateKey().
+
+    Each entry holds (depth, bound, value, action): the number of plies that
+    were searched below the node, whether the value is EXACT or only a LOWER
+    or UPPER bound (alpha-beta cut-offs), the value and the best action
+    found.  Once maxSize entries are stored the least recently used one is
+    evicted.
+    """
+    EXACT, LOWER, UPPER = 0, 1, 2
+
+    def __init__(self, maxSize=1000000):
+        self.maxSize = maxSize
+        self.entries = OrderedDict()
+        self.probes = 0
+        self.hits = 0
+
+    def lookup(self, key, depth):
+        """
+        Returns the entry for key if it was searched at least depth plies
+        deep, otherwise None.
+        """
+        self.probes += 1
+        entry = self.entries.get(key)
+        if entry is None or entry[0] < depth:
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry
+
+    def store(self, key, depth, bound, value, action):
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] > depth:
+            return  # Keep the deeper result
+        self.entries[key] = (depth, bound, value, action)
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxSize:
+            self.entries.popitem(last=False)
+
+    def hitRate(self):
+        if self.probes == 0:
+            return 0.0
+        return self.hits / float(self.probes)
+
+
 class MultiAgentSearchAgent(Agent):
     """
     This class provides some common elements to all of your
@@ -131,10 +409,72 @@ class MultiAgentSearchAgent(Agent):
     is another abstract class.
     """
 
-    def __init__(self, evalFn='scoreEvaluationFunction', depth='2'):
+    def __init__(self, evalFn='scoreEvaluationFunction', depth='2', tt='0', ttSize='1000000', timeBudget='0'):
         self.index = 0  # Pacman is always agent index 0
         self.evaluationFunction = util.lookup(evalFn, globals())
         self.depth = int(depth)
+        # Optional transposition table, enabled with -a tt=1,ttSize=<entries>
+        self.transpositions = TranspositionTable(int(ttSize)) if int(tt) else None
+        # Seconds per move for iterative deepening; 0 searches to self.depth
+        self.timeBudget = float(timeBudget)
+        self.searchedDepth = 0
+
+    def attachFeatures(self, gameState):
+        """
+        Attaches EvaluationFeatures to the root of a search when the
+        evaluation function reads them (it names their metric in a
+        featureMetric attribute), so that every state of the search derives
+        its features from its parent's instead of computing them again.
+        """
+        metric = getattr(self.evaluationFunction, 'featureMetric', None)
+        if metric is not None:
+            EvaluationFeatures.attach(gameState, metric)
+
+    def getDeadline(self):
+        """
+        Returns the wall-clock time at which the current move's search must
+        stop, or None when searching to a fixed depth.
+        """
+        if self.timeBudget > 0:
+            return time.time() + self.timeBudget
+        return None
+
+    def iterativeDeepening(self, gameState, search):
+        """
+        Anytime search: calls search(depth, firstAction) for depth = 1, 2, ...
+        until it raises SearchTimeout, and returns the action of the deepest
+        search that completed.  firstAction is the best action of the previous
+        iteration, which search() should try first.
+        """
+        bestAction = None
+        depth = 1
+        try:
+            while True:
+                bestAction = search(depth, bestAction)[1]
+                self.searchedDepth = depth
+                depth += 1
+        except SearchTimeout:
+            pass
+        if bestAction is None:  # Not even a one ply search completed
+            bestAction = gameState.getLegalActions(self.index)[0]
+        return bestAction
+
+    def preferFirst(self, actions, firstAction):
+        """
+        Returns actions reordered so that firstAction (if legal) comes first.
+        """
+        if firstAction not in actions:
+            return actions
+        return [firstAction] + [action for action in actions if action != firstAction]
+
+    def final(self, state):
+        """
+        Reports the transposition table hit rate at the end of each game.
+        """
+        table = self.transpositions
+        if table is not None:
+            print('[%s] transposition table: %d probes, %d hits (%.1f%%), %d entries' %
+                  (type(self).__name__, table.probes, table.hits, 100 * table.hitRate(), len(table.entries)))
 
 
 class MinimaxAgent(MultiAgentSearchAgent):
@@ -165,22 +505,34 @@ class MinimaxAgent(MultiAgentSearchAgent):
         gameState.isLose():
         Returns whether or not the game state is a losing state
         """
+        self.attachFeatures(gameState)
 
         def minimax(agentIndex, depth, gameState):
             """
             Method that implements the minimax algorithm
             """
             # Check if the game is over or if the depth is reached
-            if gameState.isWin() or gameState.isLose() or depth == self.depth:
+            if gameState.isWin() or gameState.isLose() or depth == maxDepth:
                 return self.evaluationFunction(gameState), None  # Return the score of the state and None as action
+            # Give up if the time budget for this move has run out
+            if deadline is not None and time.time() > deadline:
+                raise SearchTimeout()
+            # Reuse the value of this position if it was already searched deep enough
+            if table is not None:
+                key = stateKey(gameState, agentIndex)
+                entry = table.lookup(key, maxDepth - depth)
+                if entry is not None:
+                    return entry[2], entry[3]
             # Get the legal actions for the current agent
             actions = gameState.getLegalActions(agentIndex)
+            if agentIndex == 0 and depth == 0:  # Root: try the previous iteration's best action first
+                actions = self.preferFirst(actions, firstAction)
 
             if agentIndex == 0:  # Pacman's turn (Max)
                 # Get the values of the next states and the corresponding actions
                 values = [minimax(1, depth, gameState.generateSuccessor(agentIndex, action))[0] for action in actions]
-                # Return the maximum value and the corresponding action
-                return max(values), actions[values.index(max(values))]
+                # Keep the maximum value and the corresponding action
+                result = max(values), actions[values.index(max(values))]
             else:  # Ghosts' turn (Min)
                 # If the last ghost has played, increase the depth by 1 otherwise keep the same depth
                 nextAgent = agentIndex + 1 if agentIndex + 1 < gameState.getNumAgents() else 0
@@ -188,9 +540,27 @@ class MinimaxAgent(MultiAgentSearchAgent):
                 # Get the values of the next states and the corresponding actions
                 values = [minimax(nextAgent, nextDepth, gameState.generateSuccessor(agentIndex, action))[0] for action
                           in actions]
-                # Return the minimum value and the corresponding action
-                return min(values), actions[values.index(min(values))]
+                # Keep the minimum value and the corresponding action
+                result = min(values), actions[values.index(min(values))]
 
+            if table is not None:
+                table.store(key, maxDepth - depth, TranspositionTable.EXACT, result[0], result[1])
+            return result
+
+        def search(depth, previousBest):
+            """
+            Searches depth plies from the root, trying previousBest first
+            """
+            nonlocal maxDepth, firstAction
+            maxDepth, firstAction = depth, previousBest
+            return minimax(0, 0, gameState)
+
+        table = self.transpositions
+        deadline = self.getDeadline()
+        maxDepth, firstAction = self.depth, None
+
+        if deadline is not None:
+            return self.iterativeDeepening(gameState, search)
         return minimax(0, 0, gameState)[1]  # Return the action of the root node
 
         # util.raiseNotDefined()
@@ -199,37 +569,146 @@ class MinimaxAgent(MultiAgentSearchAgent):
 class AlphaBetaAgent(MultiAgentSearchAgent):
     """
     Your minimax agent with alpha-beta pruning (question 3)
+
+    The order in which actions are searched is selected with the ordering
+    agent argument (e.g. -a ordering=killer):
+
+      none     the order returned by getLegalActions
+      eval     best successor by the evaluation function first
+      killer   the last best actions found at the same ply first
+      history  actions that were often best from the same position first
+
+    Killer and history credit the best action of every node searched,
+    whether or not it caused a cut-off.  Crediting cut-offs alone hardly
+    changes the order here: the pruning tests are strict, and most cut-offs
+    happen at ghost nodes with one or two legal moves.
+
+    With stats=1 the number of nodes searched per move is reported at the end
+    of each game.
     """
+    ORDERINGS = ['none', 'eval', 'killer', 'history']
+
+    def __init__(self, ordering='none', stats='0', **args):
+        MultiAgentSearchAgent.__init__(self, **args)
+        if ordering not in self.ORDERINGS:
+            raise Exception('Unknown move ordering %s, use one of %s' % (ordering, ', '.join(self.ORDERINGS)))
+        self.ordering = ordering
+        self.stats = int(stats)
+        self.killers = {}  # ply -> the last two best actions found there
+        self.history = {}  # (agentIndex, position, action) -> best action score
+        self.nodesSearched = 0
+        self.nodeCounts = []  # nodes searched for every move of the game
+
+    def orderActions(self, gameState, agentIndex, ply, actions, successors):
+        """
+        Returns actions in the order they should be searched.  Successors that
+        had to be generated to decide the order are left in successors.
+        """
+        if self.ordering == 'eval':
+            scores = {}
+            for action in actions:
+                successors[action] = gameState.generateSuccessor(agentIndex, action)
+                scores[action] = self.evaluationFunction(successors[action])
+            return sorted(actions, key=lambda action: scores[action], reverse=(agentIndex == 0))
+        if self.ordering == 'killer':
+            killers = [action for action in self.killers.get(ply, []) if action in actions]
+            return killers + [action for action in actions if action not in killers]
+        if self.ordering == 'history':
+            position = gameState.data.agentStates[agentIndex].getPosition()
+            history = self.history
+            return sorted(actions, key=lambda action: -history.get((agentIndex, position, action), 0))
+        return actions
+
+    def recordBestAction(self, gameState, agentIndex, ply, action, remainingDepth):
+        """
+        Remembers that action was the best one from gameState (or caused a
+        cut-off there), for the killer and history orderings.
+        """
+        if self.ordering == 'killer':
+            killers = self.killers.setdefault(ply, [])
+            if action not in killers:
+                killers.insert(0, action)
+                del killers[2:]
+        elif self.ordering == 'history':
+            key = (agentIndex, gameState.data.agentStates[agentIndex].getPosition(), action)
+            self.history[key] = self.history.get(key, 0) + 2 ** remainingDepth
+
+    def final(self, state):
+        MultiAgentSearchAgent.final(self, state)
+        if self.stats and self.nodeCounts:
+            print('[AlphaBetaAgent] ordering=%s: %d moves, %d nodes searched (%.1f per move)' %
+                  (self.ordering, len(self.nodeCounts), sum(self.nodeCounts),
+                   sum(self.nodeCounts) / float(len(self.nodeCounts))))
+            self.nodeCounts = []
 
     def getAction(self, gameState):
+        self.killers = {}
+        # Age the history scores so that recent cut-offs weigh the most
+        for key in self.history:
+            self.history[key] //= 2
+        self.nodesSearched = 0
+        self.attachFeatures(gameState)
+        action = self.searchAction(gameState)
+        self.nodeCounts.append(self.nodesSearched)
+        return action
+
+    def searchAction(self, gameState):
         def alphabeta(agentIndex, depth, gameState, alpha, beta):
             """
             Method that implements the minimax algorithm with alpha-beta pruning
             """
+            self.nodesSearched += 1
             # Check if the game is over or if the depth is reached
-            if gameState.isWin() or gameState.isLose() or depth == self.depth:
+            if gameState.isWin() or gameState.isLose() or depth == maxDepth:
                 return self.evaluationFunction(gameState), None  # Return the score of the state and None as action
-            # Get the legal actions for the current agent
-            actions = gameState.getLegalActions(agentIndex)
+            # Give up if the time budget for this move has run out
+            if deadline is not None and time.time() > deadline:
+                raise SearchTimeout()
+            # Use a stored result for this position: exact values are returned
+            # directly, bounds narrow the window and may cut off the search
+            if table is not None:
+                key = stateKey(gameState, agentIndex)
+                entry = table.lookup(key, maxDepth - depth)
+                if entry is not None:
+                    _, bound, stored_value, stored_action = entry
+                    if bound == TranspositionTable.EXACT:
+                        return stored_value, stored_action
+                    if bound == TranspositionTable.LOWER:
+                        if stored_value > beta:
+                            return stored_value, stored_action
+                        alpha = max(alpha, stored_value)
+                    else:
+                        if stored_value < alpha:
+                            return stored_value, stored_action
+                        beta = min(beta, stored_value)
+                # Remember the window this node is searched with to classify its value
+                window = (alpha, beta)
+            # Get the legal actions for the current agent, in the order they should be searched
+            ply = depth * gameState.getNumAgents() + agentIndex
+            successors = {}
+            actions = self.orderActions(gameState, agentIndex, ply, gameState.getLegalActions(agentIndex), successors)
+            if agentIndex == 0 and depth == 0:  # Root: try the previous iteration's best action first
+                actions = self.preferFirst(actions, firstAction)
 
             if agentIndex == 0:  # Pacman's turn (Max)
                 value = float('-inf')  # Initialize the value to -infinity
                 action_to_take = None  # Initialize the action to None
                 # For each action of the current agent
                 for action in actions:
+                    successor = successors.get(action)
+                    if successor is None:
+                        successor = gameState.generateSuccessor(agentIndex, action)
                     # Get the value of the next state
-                    new_value, _ = alphabeta(1, depth, gameState.generateSuccessor(agentIndex, action), alpha, beta)
+                    new_value, _ = alphabeta(1, depth, successor, alpha, beta)
                     # If the value is greater than the current value, update the value and the action
                     if new_value > value:
                         value = new_value
                         action_to_take = action
-                    # If the value is greater than beta, return the value and the action (pruning)
+                    # If the value is greater than beta, stop searching (pruning)
                     if value > beta:
-                        return value, action_to_take
+                        break
                     # Update alpha
                     alpha = max(alpha, value)
-                # Return the value and the action
-                return value, action_to_take
             else:  # Ghosts' turn (Min)
                 value = float('inf')  # Initialize the value to infinity
                 action_to_take = None  # Initialize the action to None
@@ -238,20 +717,49 @@ class AlphaBetaAgent(MultiAgentSearchAgent):
                 nextDepth = depth + 1 if nextAgent == 0 else depth
                 # For each action of the current agent
                 for action in actions:
+                    successor = successors.get(action)
+                    if successor is None:
+                        successor = gameState.generateSuccessor(agentIndex, action)
                     # Get the value of the next state
-                    new_value, _ = alphabeta(nextAgent, nextDepth, gameState.generateSuccessor(agentIndex, action), alpha, beta)
+                    new_value, _ = alphabeta(nextAgent, nextDepth, successor, alpha, beta)
                     # If the value is smaller than the current value, update the value and the action
                     if new_value < value:
                         value = new_value
                         action_to_take = action
-                    # If the value is smaller than alpha, return the value and the action (pruning)
+                    # If the value is smaller than alpha, stop searching (pruning)
                     if value < alpha:
-                        return value, action_to_take
+                        break
                     # Update beta
                     beta = min(beta, value)
-                # Return the value and the action
-                return value, action_to_take
 
+            if action_to_take is not None:
+                self.recordBestAction(gameState, agentIndex, ply, action_to_take, maxDepth - depth)
+            if table is not None:
+                # A value outside the search window is only a bound on the true value
+                if value <= window[0]:
+                    bound = TranspositionTable.UPPER
+                elif value >= window[1]:
+                    bound = TranspositionTable.LOWER
+                else:
+                    bound = TranspositionTable.EXACT
+                table.store(key, maxDepth - depth, bound, value, action_to_take)
+            # Return the value and the action
+            return value, action_to_take
+
+        def search(depth, previousBest):
+            """
+            Searches depth plies from the root, trying previousBest first
+            """
+            nonlocal maxDepth, firstAction
+            maxDepth, firstAction = depth, previousBest
+            return alphabeta(0, 0, gameState, float('-inf'), float('inf'))
+
+        table = self.transpositions
+        deadline = self.getDeadline()
+        maxDepth, firstAction = self.depth, None
+
+        if deadline is not None:
+            return self.iterativeDeepening(gameState, search)
         return alphabeta(0, 0, gameState, float('-inf'), float('inf'))[1] # Return the action of the root node
 
 
@@ -259,7 +767,54 @@ class AlphaBetaAgent(MultiAgentSearchAgent):
 class ExpectimaxAgent(MultiAgentSearchAgent):
     """
       Your expectimax agent (question 4)
+
+    The value of a ghost (chance) node only depends on the state and the
+    remaining depth, so within a move it is computed once and looked up when
+    the same node is reached again by another order of moves (memo=0 turns
+    this off).
+
+    Chance nodes can be pruned when the evaluation function is known to stay
+    within [lowerBound, upperBound] (e.g. -a pruning=star1,lowerBound=-1000,upperBound=2000).
+    With relative=1 the bounds are offsets from the evaluation of the state
+    the move is chosen in, which is much tighter for scoreEvaluationFunction:
+    within depth 3 on two ghosts the score changes by -503 to 930.
+
+      none   plain expectimax
+      star1  stop averaging a ghost's moves once the bounds of the moves
+             not searched yet show the average is outside the window
+      star2  star1, plus a probe of Pacman's first move below each ghost
+             move, whose value bounds the rest from below before the
+             full search
+
+    Pruning returns the same action as plain expectimax as long as every
+    evaluation really is within the bounds.  It is not a speedup here, so
+    none is the default: the sound bounds of the score are so wide that
+    cut-offs are rare, and the bounds they leave in the memo are reused less
+    often than exact values.  On smallClassic at depth 3 star1 and star2
+    search a few percent more nodes than none, and take longer.
     """
+    PRUNINGS = ['none', 'star1', 'star2']
+
+    def __init__(self, pruning='none', lowerBound='-inf', upperBound='inf', relative='0', memo='1', **args):
+        MultiAgentSearchAgent.__init__(self, **args)
+        if pruning not in self.PRUNINGS:
+            raise Exception('Unknown pruning %s, use one of %s' % (pruning, ', '.join(self.PRUNINGS)))
+        self.pruning = pruning
+        self.lowerBound = float(lowerBound)
+        self.upperBound = float(upperBound)
+        if pruning != 'none' and (self.lowerBound == float('-inf') or self.upperBound == float('inf')):
+            raise Exception('Pruning %s needs finite lowerBound and upperBound' % pruning)
+        self.relative = int(relative)
+        self.memo = int(memo)
+
+    def chanceKey(self, gameState, agentIndex, depth):
+        """
+        Returns the memo key of a chance node.  States without game data (the
+        autograder's game trees) are only equal to themselves.
+        """
+        if getattr(gameState, 'data', None) is None:
+            return (depth, agentIndex, gameState)
+        return (depth, stateKey(gameState, agentIndex))
 
     def getAction(self, gameState):
         """
@@ -268,8 +823,362 @@ class ExpectimaxAgent(MultiAgentSearchAgent):
         All ghosts should be modeled as choosing uniformly at random from their
         legal moves.
         """
-        "*** YOUR CODE HERE ***"
-        util.raiseNotDefined()
+        self.attachFeatures(gameState)
+
+        def expectimax(agentIndex, depth, gameState, alpha, beta):
+            """
+            Returns (value, action) of a node.  When pruning, a value at or
+            below alpha is only an upper bound on the true value, and a value
+            at or above beta only a lower bound.
+            """
+            # Check if the game is over or if the depth is reached
+            if gameState.isWin() or gameState.isLose() or depth == maxDepth:
+                return self.evaluationFunction(gameState), None
+            # Give up if the time budget for this move has run out
+            if deadline is not None and time.time() > deadline:
+                raise SearchTimeout()
+            actions = gameState.getLegalActions(agentIndex)
+
+            if agentIndex == 0:  # Pacman's turn (Max)
+                if depth == 0:  # Root: try the previous iteration's best action first
+                    actions = self.preferFirst(actions, firstAction)
+                value, action_to_take = float('-inf'), None
+                for action in actions:
+                    new_value = expectimax(1, depth, gameState.generateSuccessor(0, action),
+                                           max(alpha, value), beta)[0]
+                    if new_value > value:
+                        value, action_to_take = new_value, action
+                    # Only reachable when pruning: the chance node above will not use this value
+                    if value >= beta:
+                        break
+                return value, action_to_take
+
+            # Ghost's turn (Chance): every legal action is equally likely
+            if memo is not None:
+                key = self.chanceKey(gameState, agentIndex, maxDepth - depth)
+                entry = memo.get(key)
+                if entry is not None:
+                    value, bound = entry
+                    if bound == EXACT or (bound == LOWER and value >= beta) or (bound == UPPER and value <= alpha):
+                        return value, None
+            nextAgent = agentIndex + 1 if agentIndex + 1 < gameState.getNumAgents() else 0
+            nextDepth = depth + 1 if nextAgent == 0 else depth
+            count = len(actions)
+
+            if pruning == 'none':
+                total = 0.0
+                for action in actions:
+                    total += expectimax(nextAgent, nextDepth, gameState.generateSuccessor(agentIndex, action),
+                                        alpha, beta)[0]
+                value, bound = total / count, EXACT
+            else:
+                value, bound = starChance(gameState, agentIndex, actions, nextAgent, nextDepth, alpha, beta)
+
+            if memo is not None and (bound == EXACT or memo.get(key, (0, bound))[1] != EXACT):
+                memo[key] = (value, bound)
+            return value, None
+
+        def starChance(gameState, agentIndex, actions, nextAgent, nextDepth, alpha, beta):
+            """
+            Star1/star2 chance node.  Returns (value, bound) where bound is
+            EXACT, or LOWER or UPPER when the search stopped early and value
+            only bounds the true value.  Successors are generated as they
+            are needed, so a cut-off also saves generating the rest.
+            """
+            count = len(actions)
+            successors = [None] * count
+            # Lower bounds on every successor's value, raised by star2 probing
+            floors = [lower] * count
+            if pruning == 'star2' and nextAgent == 0 and nextDepth < maxDepth:
+                for i, action in enumerate(actions):
+                    # Stop probing once even probes at the upper bound could
+                    # not lift the average of the floors to beta (e.g. at once
+                    # when beta is above upper)
+                    if sum(floors) + (count - i) * (upper - lower) < count * beta:
+                        break
+                    successor = successors[i] = gameState.generateSuccessor(agentIndex, action)
+                    if successor.isWin() or successor.isLose():
+                        continue
+                    probeAction = successor.getLegalActions(0)[0]
+                    floors[i] = expectimax(1, nextDepth, successor.generateSuccessor(0, probeAction),
+                                           lower, upper)[0]
+                    # The average is at least the average of the floors
+                    if sum(floors) / count >= beta:
+                        return sum(floors) / count, LOWER
+
+            total = 0.0
+            floorsLeft = sum(floors)
+            for i, action in enumerate(actions):
+                successor = successors[i]
+                if successor is None:
+                    successor = gameState.generateSuccessor(agentIndex, action)
+                floorsLeft -= floors[i]
+                ceilingLeft = (count - i - 1) * upper
+                # The window this successor's value has to fall in to matter
+                childAlpha = max(floors[i], count * alpha - total - ceilingLeft)
+                childBeta = min(upper, count * beta - total - floorsLeft)
+                value = expectimax(nextAgent, nextDepth, successor, childAlpha, childBeta)[0]
+                total += value
+                if (total + ceilingLeft) / count <= alpha:
+                    return (total + ceilingLeft) / count, UPPER
+                if (total + floorsLeft) / count >= beta:
+                    return (total + floorsLeft) / count, LOWER
+            return total / count, EXACT
+
+        def search(depth, previousBest):
+            """
+            Searches depth plies from the root, trying previousBest first
+            """
+            nonlocal maxDepth, firstAction
+            maxDepth, firstAction = depth, previousBest
+            return expectimax(0, 0, gameState, float('-inf'), float('inf'))
+
+        pruning, lower, upper = self.pruning, self.lowerBound, self.upperBound
+        if pruning != 'none' and self.relative:
+            rootValue = self.evaluationFunction(gameState)
+            lower, upper = rootValue + lower, rootValue + upper
+        # Chance node values of this move, keyed by chanceKey(), with whether
+        # they are EXACT or only a LOWER or UPPER bound left by a cut-off; the
+        # key holds the remaining depth, so iterative deepening reuses them too
+        EXACT, LOWER, UPPER = TranspositionTable.EXACT, TranspositionTable.LOWER, TranspositionTable.UPPER
+        memo = {} if self.memo else None
+        deadline = self.getDeadline()
+        maxDepth, firstAction = self.depth, None
+
+        if deadline is not None:
+            return self.iterativeDeepening(gameState, search)
+        return expectimax(0, 0, gameState, float('-inf'), float('inf'))[1]  # Return the action of the root node
+
+
+class MCTSNode:
+    """
+    A node of MCTSAgent's tree: the statistics of one sequence of Pacman
+    actions from the root.  Ghost moves are sampled anew on every visit, so
+    the node stands for all the states that sequence can lead to.
+    """
+    __slots__ = ('visits', 'total', 'children', 'untried')
+
+    def __init__(self):
+        self.visits = 0
+        self.total = 0.0
+        self.children = {}  # action -> MCTSNode
+        self.untried = None  # Actions not expanded yet, set on the first visit
+
+
+def runMCTSInWorker(job):
+    """
+    Searches from a state in a worker process of MCTSAgent with its own
+    random seed, and returns the visits and value totals of the root's
+    actions.
+    """
+    agent, gameState, iterations, deadline, seed = job
+    return agent.searchRoot(gameState, iterations, deadline, random.Random(seed))
+
+
+class MCTSAgent(MultiAgentSearchAgent):
+    """
+    A Monte Carlo tree search (UCT) agent, whose cost grows with the
+    number of simulations rather than exponentially with the number of ghosts.
+
+    Every simulation walks down the tree choosing Pacman's actions by UCT
+    with the given exploration constant, moves the ghosts uniformly at
+    random, expands one new action and plays a rollout of rolloutDepth
+    moves of a cheap policy (Pacman avoids stopping and turning back, ghosts
+    move at random).  The state it ends in is scored by the evaluation
+    function, so -a evalFn=better works as for the other agents.  The most
+    visited action of the root is played.
+
+    Each move runs for timeBudget seconds, or for iterations simulations
+    when no budget is given.  With workers=N, N processes search
+    independent trees (root parallelization) and their root statistics are
+    summed; fixed iterations are split between them.
+
+    All the randomness of the search comes from the agent's own generator,
+    seeded with seed (or from the random module when no seed is given, so
+    that pacman.py --fixRandomSeed still replays the same game), and the
+    workers get their seeds from it.  The pool lives until final() or
+    close(); the agent is also a context manager, and the pool is
+    terminated when the agent is garbage collected or the search fails.
+    """
+
+    def __init__(self, exploration='1.4', rolloutDepth='10', iterations='300', workers='1', stats='0',
+                 seed=None, **args):
+        MultiAgentSearchAgent.__init__(self, **args)
+        self.exploration = float(exploration)
+        self.rolloutDepth = int(rolloutDepth)
+        self.iterations = int(iterations)
+        self.workers = int(workers)
+        self.stats = int(stats)
+        self.random = random.Random(random.randrange(2 ** 31) if seed is None else int(seed))
+        self.pool = None
+        self.poolFinalizer = None
+        self.simulationCounts = []  # simulations run for every move of the game
+
+    def __getstate__(self):
+        # The worker pool stays in the process that created it
+        state = self.__dict__.copy()
+        state['pool'] = state['poolFinalizer'] = None
+        return state
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excInfo):
+        self.close()
+
+    def close(self):
+        "Terminates the worker pool, which is started again if needed"
+        if self.pool is not None:
+            self.poolFinalizer()  # Runs pool.terminate() once
+            self.pool = self.poolFinalizer = None
+
+    def getPool(self):
+        """
+        Returns the worker pool, started on first use, or None when the
+        search has to run in this process: one worker, no fork() support, or
+        a daemonic process (e.g. a pacman.py --workers game) that cannot have
+        children.
+        """
+        import multiprocessing
+        if self.workers <= 1 or multiprocessing.current_process().daemon or \
+                'fork' not in multiprocessing.get_all_start_methods():
+            return None
+        if self.pool is None:
+            pool = multiprocessing.get_context('fork').Pool(self.workers)
+            # Does not reference the agent, so it can still be collected
+            self.poolFinalizer = weakref.finalize(self, pool.terminate)
+            self.pool = pool
+        return self.pool
+
+    def getAction(self, gameState):
+        self.attachFeatures(gameState)
+        deadline = self.getDeadline()
+        pool = self.getPool()
+        if pool is None:
+            statistics = [self.searchRoot(gameState, self.iterations, deadline, self.random)]
+        else:
+            iterations = (self.iterations + self.workers - 1) // self.workers
+            jobs = [(self, gameState, iterations, deadline, self.random.randrange(2 ** 31))
+                    for i in range(self.workers)]
+            try:
+                statistics = pool.map(runMCTSInWorker, jobs)
+            except BaseException:
+                # Do not leave the workers running after e.g. Ctrl-C
+                self.close()
+                raise
+
+        # Merge the visit statistics of all the trees
+        visits = {}
+        for rootStatistics in statistics:
+            for action, (count, total) in rootStatistics.items():
+                visits[action] = visits.get(action, 0) + count
+        self.simulationCounts.append(sum(visits.values()))
+        if not visits:  # Not even one simulation finished
+            return gameState.getLegalActions(self.index)[0]
+        return max(visits, key=visits.get)
+
+    def searchRoot(self, gameState, iterations, deadline, rng):
+        """
+        Runs simulations from gameState until the deadline (or for iterations
+        simulations without one) and returns {action: (visits, value total)}
+        for the root's actions.
+        """
+        root = MCTSNode()
+        self.lowest, self.highest = float('inf'), float('-inf')
+        simulations = 0
+        while True:
+            if deadline is not None:
+                if time.time() >= deadline:
+                    break
+            elif simulations >= iterations:
+                break
+            self.simulate(root, gameState, rng)
+            simulations += 1
+        return dict([(action, (child.visits, child.total)) for action, child in root.children.items()])
+
+    def simulate(self, root, gameState, rng):
+        """
+        One simulation: selection, expansion, rollout and backpropagation.
+        """
+        node, state = root, gameState
+        path = [root]
+        while not (state.isWin() or state.isLose()):
+            if node.untried is None:
+                node.untried = self.candidateActions(state)
+                rng.shuffle(node.untried)
+            if node.untried:
+                # Expand one new action and leave the tree
+                action = node.untried.pop()
+                node.children[action] = MCTSNode()
+                node = node.children[action]
+                state = self.playRound(state, action, rng)
+                path.append(node)
+                break
+            action = self.selectAction(node)
+            node = node.children[action]
+            state = self.playRound(state, action, rng)
+            path.append(node)
+
+        value = self.rollout(state, rng)
+        self.lowest = min(self.lowest, value)
+        self.highest = max(self.highest, value)
+        for node in path:
+            node.visits += 1
+            node.total += value
+
+    def selectAction(self, node):
+        """
+        Returns the child action with the best UCT score.  Values are scaled
+        to [0, 1] by the lowest and highest value seen in this search, so that
+        the exploration constant does not depend on the score scale.
+        """
+        spread = self.highest - self.lowest
+        logVisits = math.log(node.visits)
+        bestScore, bestAction = float('-inf'), None
+        for action, child in node.children.items():
+            mean = child.total / child.visits
+            exploit = (mean - self.lowest) / spread if spread > 0 else 0.5
+            score = exploit + self.exploration * math.sqrt(logVisits / child.visits)
+            if score > bestScore:
+                bestScore, bestAction = score, action
+        return bestAction
+
+    def candidateActions(self, state):
+        "Pacman's legal actions without STOP, unless it is the only one"
+        actions = state.getLegalActions(0)
+        moves = [action for action in actions if action != Directions.STOP]
+        return moves or actions
+
+    def playRound(self, state, action, rng):
+        "Applies Pacman's action and a uniformly random move of every ghost"
+        state = state.generateSuccessor(0, action)
+        for ghostIndex in range(1, state.getNumAgents()):
+            if state.isWin() or state.isLose():
+                break
+            state = state.generateSuccessor(ghostIndex, rng.choice(state.getLegalActions(ghostIndex)))
+        return state
+
+    def rollout(self, state, rng):
+        """
+        Plays rolloutDepth rounds of the rollout policy and returns the
+        evaluation of the state it ends in.
+        """
+        for i in range(self.rolloutDepth):
+            if state.isWin() or state.isLose():
+                break
+            actions = self.candidateActions(state)
+            reverse = Directions.REVERSE[state.data.agentStates[0].getDirection()]
+            forward = [action for action in actions if action != reverse]
+            state = self.playRound(state, rng.choice(forward or actions), rng)
+        return self.evaluationFunction(state)
+
+    def final(self, state):
+        MultiAgentSearchAgent.final(self, state)
+        if self.stats and self.simulationCounts:
+            print('[MCTSAgent] %d moves, %.1f simulations per move' %
+                  (len(self.simulationCounts), sum(self.simulationCounts) / float(len(self.simulationCounts))))
+        self.simulationCounts = []
+        self.close()
 
 
 def betterEvaluationFunction(currentGameState):
@@ -277,10 +1186,29 @@ def betterEvaluationFunction(currentGameState):
     Your extreme ghost-hunting, pellet-nabbing, food-gobbling, unstoppable
     evaluation function (question 5).
 
-    DESCRIPTION: <write something here so we know what you did>
+    DESCRIPTION: starts from the game score and, using maze distances kept
+    up to date along the search path by EvaluationFeatures, rewards being
+    close to the nearest pellet and having little food and few capsules
+    left.  Scared ghosts that Pacman can reach before they recover are
+    chased; other ghosts are avoided once they get close.
     """
-    "*** YOUR CODE HERE ***"
-    util.raiseNotDefined()
+    score = currentGameState.getScore()
+    if currentGameState.isWin() or currentGameState.isLose():
+        return score
+    features = EvaluationFeatures.attach(currentGameState, 'maze')
+
+    score -= 2 * features.nearestFood + 4 * features.numFood
+    score -= 20 * len(currentGameState.getCapsules())
+    for ghostState, distance in zip(currentGameState.getGhostStates(), features.ghostDistances):
+        if ghostState.scaredTimer > distance:
+            score += 200 / (distance + 1)
+        elif distance <= 2:
+            score -= 100 * (3 - distance)
+    return score
+
+
+# The features betterEvaluationFunction reads, see MultiAgentSearchAgent.attachFeatures
+betterEvaluationFunction.featureMetric = 'maze'
 
 
 # Abbreviation
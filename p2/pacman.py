@@ -79,6 +79,10 @@ class GameState:
 
     # static variable keeps track of which states have had getLegalActions called
     explored = set()
+    # headless games turn the bookkeeping off; it hashes every successor
+    trackExplored = True
+    # headless games trust their agents' actions and skip checking them
+    checkActions = True
 
     def getAndResetExplored():
         tmp = GameState.explored.copy()
@@ -129,8 +133,11 @@ class GameState:
         # Book keeping
         state.data._agentMoved = agentIndex
         state.data.score += state.data.scoreChange
-        GameState.explored.add(self)
-        GameState.explored.add(state)
+        if self.data.features is not None:
+            state.data.features = self.data.features.successor(state.data)
+        if GameState.trackExplored:
+            GameState.explored.add(self)
+            GameState.explored.add(state)
         return state
 
     def getLegalPacmanActions(self):
@@ -283,13 +290,15 @@ class ClassicGameRules:
     def __init__(self, timeout=30):
         self.timeout = timeout
 
-    def newGame(self, layout, pacmanAgent, ghostAgents, display, quiet=False, catchExceptions=False):
+    def newGame(self, layout, pacmanAgent, ghostAgents, display, quiet=False, catchExceptions=False, headless=False):
         agents = [pacmanAgent] + ghostAgents[:layout.getNumGhosts()]
         initState = GameState()
         initState.initialize(layout, len(ghostAgents))
         game = Game(agents, display, self, catchExceptions=catchExceptions)
         game.state = initState
-        self.initialState = initState.deepCopy()
+        # Headless agents do not modify states, so the copy (which re-parses
+        # the layout) is not needed
+        self.initialState = initState if headless else initState.deepCopy()
         self.quiet = quiet
         return game
 
@@ -348,18 +357,17 @@ class PacmanRules:
         """
         Returns a list of possible actions.
         """
-        return Actions.getPossibleActions(state.getPacmanState().configuration, state.data.layout.walls)
+        return Actions.getPossibleActions(state.data.agentStates[0].configuration, state.data.layout.walls)
     getLegalActions = staticmethod(getLegalActions)
 
     def applyAction(state, action):
         """
         Edits the state to reflect the results of the action.
         """
-        legal = PacmanRules.getLegalActions(state)
-        if action not in legal:
+        if GameState.checkActions and action not in PacmanRules.getLegalActions(state):
             raise Exception("Illegal action " + str(action))
 
-        pacmanState = state.data.agentStates[0]
+        pacmanState = state.data.copyAgentState(0)
 
         # Update Configuration
         vector = Actions.directionToVector(action, PacmanRules.PACMAN_SPEED)
@@ -389,11 +397,12 @@ class PacmanRules:
                 state.data._win = True
         # Eat capsule
         if(position in state.getCapsules()):
+            state.data.capsules = state.data.capsules[:]
             state.data.capsules.remove(position)
             state.data._capsuleEaten = position
             # Reset all ghosts' scared timers
             for index in range(1, len(state.data.agentStates)):
-                state.data.agentStates[index].scaredTimer = SCARED_TIME
+                state.data.copyAgentState(index).scaredTimer = SCARED_TIME
     consume = staticmethod(consume)
 
 
@@ -421,11 +430,10 @@ class GhostRules:
 
     def applyAction(state, action, ghostIndex):
 
-        legal = GhostRules.getLegalActions(state, ghostIndex)
-        if action not in legal:
+        if GameState.checkActions and action not in GhostRules.getLegalActions(state, ghostIndex):
             raise Exception("Illegal ghost action " + str(action))
 
-        ghostState = state.data.agentStates[ghostIndex]
+        ghostState = state.data.copyAgentState(ghostIndex)
         speed = GhostRules.GHOST_SPEED
         if ghostState.scaredTimer > 0:
             speed /= 2.0
@@ -460,6 +468,7 @@ class GhostRules:
     def collide(state, ghostState, agentIndex):
         if ghostState.scaredTimer > 0:
             state.data.scoreChange += 200
+            ghostState = state.data.copyAgentState(agentIndex)
             GhostRules.placeGhost(state, ghostState)
             ghostState.scaredTimer = 0
             # Added for first-person
@@ -554,6 +563,10 @@ def readCommand(argv):
                       help='Turns on exception handling and timeouts during games', default=False)
     parser.add_option('--timeout', dest='timeout', type='int',
                       help=default('Maximum length of time an agent can spend computing in a single game'), default=30)
+    parser.add_option('--workers', dest='workers', type='int',
+                      help=default('Number of processes to play games in; more than 1 implies no graphics'), default=1)
+    parser.add_option('--headless', action='store_true', dest='headless',
+                      help='Play games on a fast path for trusted agents: no graphics, copies, timing or exception handling', default=False)
 
     options, otherjunk = parser.parse_args(argv)
     if len(otherjunk) != 0:
@@ -591,7 +604,9 @@ def readCommand(argv):
     args['ghosts'] = [ghostType(i+1) for i in range(options.numGhosts)]
 
     # Choose a display format
-    if options.quietGraphics:
+    if options.headless and options.catchExceptions:
+        raise Exception('Headless games cannot catch agent exceptions')
+    if options.quietGraphics or options.workers > 1 or options.headless:
         import textDisplay
         args['display'] = textDisplay.NullGraphics()
     elif options.textGraphics:
@@ -606,6 +621,8 @@ def readCommand(argv):
     args['record'] = options.record
     args['catchExceptions'] = options.catchExceptions
     args['timeout'] = options.timeout
+    args['workers'] = options.workers
+    args['headless'] = options.headless
 
     # Special case: recorded games don't use the runGames method or args structure
     if options.gameToReplay != None:
@@ -672,26 +689,83 @@ def replayGame(layout, actions, display):
     display.finish()
 
 
-def runGames(layout, pacman, ghosts, display, numGames, record, numTraining=0, catchExceptions=False, timeout=30):
+def runGameInWorker(job):
+    """
+    Plays one game in a worker process of runGames with its own random seed.
+    The game is returned without its agents and display, which stay in the
+    parent process.
+    """
+    layout, pacman, ghosts, catchExceptions, timeout, headless, seed = job
+    import textDisplay
+    random.seed(seed)
+    GameState.trackExplored = GameState.checkActions = not headless
+    rules = ClassicGameRules(timeout)
+    game = rules.newGame(layout, pacman, ghosts,
+                         textDisplay.NullGraphics(), True, catchExceptions, headless)
+    if headless:
+        game.runHeadless()
+    else:
+        game.run()
+    game.agents = game.display = game.agentOutput = None
+    return game
+
+
+def runGamesInParallel(layout, pacman, ghosts, display, numGames, rules, catchExceptions, timeout, workers, headless):
+    """
+    Plays numGames games across a pool of worker processes and yields them in
+    order.  Each game gets a seed drawn from the parent's random generator,
+    so a run with -f is reproducible for a fixed number of games.
+    """
+    import multiprocessing
+    seeds = [random.randrange(2 ** 31) for i in range(numGames)]
+    jobs = [(layout, pacman, ghosts, catchExceptions, timeout, headless, seed)
+            for seed in seeds]
+    pool = multiprocessing.Pool(workers)
+    try:
+        for game in pool.imap(runGameInWorker, jobs):
+            game.agents = [pacman] + ghosts[:layout.getNumGhosts()]
+            game.display = display
+            # Report the outcome here so that messages come out in game order
+            rules.process(game.state, game)
+            yield game
+    finally:
+        pool.terminate()
+
+
+def runGames(layout, pacman, ghosts, display, numGames, record, numTraining=0, catchExceptions=False, timeout=30, workers=1, headless=False):
     import __main__
     __main__.__dict__['_display'] = display
+    GameState.trackExplored = GameState.checkActions = not headless
 
     rules = ClassicGameRules(timeout)
     games = []
 
+    if workers > 1:
+        if numTraining > 0:
+            raise Exception('Training games cannot be played by parallel workers')
+        rules.quiet = False
+        parallelGames = runGamesInParallel(layout, pacman, ghosts, display, numGames,
+                                           rules, catchExceptions, timeout, workers, headless)
+
     for i in range(numGames):
         beQuiet = i < numTraining
-        if beQuiet:
-                # Suppress output and graphics
-            import textDisplay
-            gameDisplay = textDisplay.NullGraphics()
-            rules.quiet = True
+        if workers > 1:
+            game = next(parallelGames)
         else:
-            gameDisplay = display
-            rules.quiet = False
-        game = rules.newGame(layout, pacman, ghosts,
-                             gameDisplay, beQuiet, catchExceptions)
-        game.run()
+            if beQuiet:
+                    # Suppress output and graphics
+                import textDisplay
+                gameDisplay = textDisplay.NullGraphics()
+                rules.quiet = True
+            else:
+                gameDisplay = display
+                rules.quiet = False
+            game = rules.newGame(layout, pacman, ghosts,
+                                 gameDisplay, beQuiet, catchExceptions, headless)
+            if headless:
+                game.runHeadless()
+            else:
+                game.run()
         if not beQuiet:
             games.append(game)
 
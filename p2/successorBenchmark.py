@@ -0,0 +1,96 @@
+# successorBenchmark.py
+# ---------------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Measures how many GameState successors per second the engine can generate.
+
+The benchmark walks a seeded random playout on a layout.  At every step it
+expands all legal actions of the agent to move (which is what a minimax
+search does at each node) and then continues from one of them, restarting
+from the initial state whenever the game ends.
+
+    > python successorBenchmark.py -l mediumClassic -n 60000 -r 7 -s cs188
+
+For a given seed, layout, ghost count and number of successors every run
+does exactly the same work, so two versions of the engine can be compared by
+running the same command in both trees.  Timings are noisy on a shared
+machine: the best and the median of several repeats are reported, and
+comparisons should alternate between the trees over a few rounds.
+"""
+
+import random
+import sys
+import time
+
+import layout
+from pacman import GameState
+
+
+def benchmarkSuccessors(lay, numSuccessors, numGhosts=4, seed='cs188'):
+    """
+    Generates numSuccessors successor states on the layout and returns the
+    elapsed wall-clock time in seconds.
+    """
+    rand = random.Random(seed)
+    initState = GameState()
+    initState.initialize(lay, numGhosts)
+    numAgents = initState.getNumAgents()
+
+    state, agentIndex, generated = initState, 0, 0
+    start = time.time()
+    while generated < numSuccessors:
+        successors = [state.generateSuccessor(agentIndex, action)
+                      for action in state.getLegalActions(agentIndex)]
+        generated += len(successors)
+        state = rand.choice(successors)
+        agentIndex = (agentIndex + 1) % numAgents
+        if state.isWin() or state.isLose():
+            state, agentIndex = initState, 0
+        # Keep the explored-state bookkeeping from growing without bound
+        GameState.getAndResetExplored()
+    return time.time() - start
+
+
+def readCommand(argv):
+    from optparse import OptionParser
+    parser = OptionParser('USAGE:      python successorBenchmark.py <options>')
+    parser.add_option('-l', '--layout', dest='layout', default='mediumClassic',
+                      help='the LAYOUT_FILE to benchmark on [Default: %default]')
+    parser.add_option('-n', '--numSuccessors', dest='numSuccessors', type='int', default=100000,
+                      help='the number of successors to generate [Default: %default]')
+    parser.add_option('-r', '--repeat', dest='repeat', type='int', default=3,
+                      help='how many times to repeat the measurement [Default: %default]')
+    parser.add_option('-k', '--numghosts', type='int', dest='numGhosts', default=4,
+                      help='The maximum number of ghosts to use [Default: %default]')
+    parser.add_option('-s', '--seed', dest='seed', default='cs188',
+                      help='the seed of the random playout [Default: %default]')
+    options, otherjunk = parser.parse_args(argv)
+    if len(otherjunk) != 0:
+        raise Exception('Command line input not understood: ' + str(otherjunk))
+    return options
+
+
+if __name__ == '__main__':
+    options = readCommand(sys.argv[1:])
+    lay = layout.getLayout(options.layout)
+    if lay == None:
+        raise Exception("The layout " + options.layout + " cannot be found")
+    times = sorted([benchmarkSuccessors(lay, options.numSuccessors, options.numGhosts, options.seed)
+                    for i in range(options.repeat)])
+    best, median = times[0], times[len(times) // 2]
+    print('Layout:        %s (%d ghosts, seed %s)' % (options.layout, options.numGhosts, options.seed))
+    print('Successors:    %d' % options.numSuccessors)
+    print('Best time:     %.3fs (of %d runs, median %.3fs)' % (best, options.repeat, median))
+    print('Throughput:    %.0f successors/s (median %.0f/s)' %
+          (options.numSuccessors / best, options.numSuccessors / median))